@@ -1,3 +1,7 @@
+from .rate_limiter import *
 from .bitfinexv1 import *
 from .bfx_helper import *
 from .bitfinex_timeframe import *
+from .async_bitfinexv1 import *
+from .candles_downloader import *
+from .candles_cache import *
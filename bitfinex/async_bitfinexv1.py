@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Store AsyncBitfinexV1 class"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from .bitfinexv1 import BitfinexV1, ApiErrorRateLimit
+
+
+class AsyncBitfinexV1(BitfinexV1):
+    """Asyncio counterpart of BitfinexV1: all API methods are the same, but return coroutines, so many requests can be
+    sent concurrently. HTTP requests are run in the thread pool of concurrency workers over the pooled HTTP session
+    (no more then concurrency requests are sent at once), rate limits are waited with asyncio.sleep() without
+    occupying the workers. Signed requests are sent one at a time by the separate single worker in the order of their
+    nonces, as Bitfinex requires strictly increasing nonces for the API key. Pass the same RateLimiter to share rate
+    limits with other (sync or async) clients. Errors are the same as BitfinexV1 ones. Usage:
+        async with AsyncBitfinexV1() as bfx:
+            tickers = await asyncio.gather(*[bfx.get_ticker(symbol) for symbol in symbols])
+    Note that sweep time is still bounded by the endpoint rate limit, use RateLimiter with burst to allow bursts.
+    """
+
+    def __init__(self, api_key='', api_secret='', concurrency=10, retries=3, backoff=0.3, rate_limiter=None):
+        """concurrency: maximum number of requests sent at once, see BitfinexV1 for other parameters"""
+        super().__init__(api_key, api_secret, pool_size=concurrency, retries=retries, backoff=backoff,
+                         rate_limiter=rate_limiter)
+        self.concurrency = concurrency
+        self.__executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.__auth_executor = ThreadPoolExecutor(max_workers=1)
+
+    async def send_public_request(self, request, params=None):
+        """Send an unsigned HTTP request"""
+        url = self.api_url + request
+        return await self._send_async(request, lambda: self.session.get(url, timeout=self.timeout, params=params))
+
+    async def send_auth_request(self, data):
+        """"Send a signed HTTP request. Nonce is generated by the auth worker right before sending, so signed requests
+        arrive in the order of their nonces"""
+        url = self.api_url + data['request']
+        return await self._send_async(
+            data['request'], lambda: self.session.post(url, headers=self.prepare_header(data), timeout=self.timeout),
+            self.__auth_executor)
+
+    async def _send_async(self, request, send, executor=None):
+        """Asynchronous variant of BitfinexV1._send(), send function is called in the given executor (the thread pool
+        by default)"""
+        key = self.rate_limit_key(request)
+        loop = asyncio.get_event_loop()
+        for attempt in range(self.rate_limit_retries + 1):
+            await asyncio.sleep(self.rate_limiter.reserve(key))
+            response = await loop.run_in_executor(executor or self.__executor, send)
+            try:
+                return self._response_error_handling(response)
+            except ApiErrorRateLimit as e:
+                self.rate_limiter.retry(key, e, attempt, self.rate_limit_retries, self.backoff_base, self.backoff_cap)
+
+    def close(self):
+        """Close HTTP session and stop the thread pools"""
+        self.__executor.shutdown(wait=False)
+        self.__auth_executor.shutdown(wait=False)
+        super().close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
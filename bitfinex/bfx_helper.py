@@ -10,6 +10,7 @@ class BitfinexHelper:
             'group': 'RPE',
             'method': 'GET',
             'endpoint': 'https://api-pub.bitfinex.com/v2/candles/trade:TimeFrame:Symbol/Section',
+            'rate_limit': 30,
         }
     }
     """Structured Bitfinex API endpoints description based on https://docs.bitfinex.com/reference"""
@@ -6,7 +6,11 @@ import hashlib
 import hmac
 import json
 import requests
+import threading
 import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .rate_limiter import RateLimiter
 
 
 class ApiError(requests.exceptions.HTTPError):
@@ -18,15 +22,84 @@ class ApiErrorRateLimit(ApiError):
 
 
 class BitfinexV1(object):
-    """Allow make queries to Bitfinex API v1 (stable). See https://docs.bitfinex.com/v1/docs"""
+    """Allow make queries to Bitfinex API v1 (stable). See https://docs.bitfinex.com/v1/docs
+    Requests are sent through the own persistent HTTP session (connections are kept alive and reused), so close the
+    client after use or use it as context manager. Requests are rate limited on the client side by endpoints (see
+    rate_limits), calls over the limit are delayed, not failed. Requests failed with ERR_RATE_LIMIT are retried with
+    jittered exponential backoff. Share one RateLimiter between clients working with the same API key or IP address:
+        with BitfinexV1(api_key, api_secret) as bfx:
+            bfx.get_ticker('btcusd')
+    """
     api_key = ''
     api_secret = ''
     api_url = 'https://api.bitfinex.com'
     timeout = 5.0
+    rate_limits = {'account_infos': 5, 'account_fees': 5, 'offers/hist': 1, 'orders/hist': 1, 'book': 30,
+                   'symbols': 10, 'pubticker': 20}
+    """Maximum numbers of requests per minute by endpoints (see methods documentation)"""
+    default_rate_limit = 10
+    """Maximum number of requests per minute for the endpoints with unknown rate limit"""
+    rate_limit_retries = 5
+    """Number of retries of the requests failed with ERR_RATE_LIMIT"""
+    backoff_base = 1.0
+    backoff_cap = 60.0
+    """Backoff delays bounds (in seconds) of the retries after ERR_RATE_LIMIT, see RateLimiter.backoff()"""
 
-    def __init__(self, api_key, api_secret):
+    @property
+    def session(self) -> requests.Session:
+        return self.__session
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self.__rate_limiter
+
+    def __init__(self, api_key, api_secret, pool_size=10, retries=3, backoff=0.3, rate_limiter=None):
+        """pool_size: number of the kept alive connections; retries: number of retries on connection errors and
+        gateway errors (502, 503, 504) with exponential backoff (backoff, 2 * backoff, ... seconds). Not idempotent
+        (POST) requests are retried only if they were not sent. rate_limiter: RateLimiter shared with other clients
+        (new one with rate_limits is created by default)"""
         self.api_key = api_key
         self.api_secret = api_secret
+        self.__session = self.create_session(pool_size, retries, backoff)
+        self.__rate_limiter = rate_limiter or self.create_rate_limiter()
+        self.__nonce = 0
+        self.__nonce_lock = threading.Lock()
+
+    @classmethod
+    def create_rate_limiter(cls) -> RateLimiter:
+        """Return new RateLimiter with the documented endpoints rate limits"""
+        return RateLimiter(cls.rate_limits, default=cls.default_rate_limit, period=60.0)
+
+    @classmethod
+    def rate_limit_key(cls, request: str) -> str:
+        """Return rate limiter key (endpoint without parameters, e.g. 'pubticker') for the given request path (e.g.
+        '/v1/pubticker/btcusd')"""
+        path = request.split('/', 2)[-1]
+        for key in sorted(cls.rate_limits, key=len, reverse=True):
+            if path == key or path.startswith(key + '/'):
+                return key
+        return path.split('/')[0]
+
+    @staticmethod
+    def create_session(pool_size=10, retries=3, backoff=0.3) -> requests.Session:
+        """Return new HTTP session with connections pool of pool_size kept alive connections and retries"""
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries, backoff_factor=backoff,
+                      status_forcelist=(502, 503, 504), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def close(self):
+        """Close HTTP session and its connections"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def account_infos(self):
         """Return information about your account (trading fees) (POST, auth, rate limit: 5)
@@ -153,15 +226,24 @@ class BitfinexV1(object):
     def send_public_request(self, request, params=None):
         """Send an unsigned HTTP request"""
         url = self.api_url + request
-        response = requests.get(url, timeout=self.timeout, params=params)
-        return self._response_error_handling(response)
+        return self._send(request, lambda: self.session.get(url, timeout=self.timeout, params=params))
 
     def send_auth_request(self, data):
         """"Send a signed HTTP request"""
         url = self.api_url + data['request']
-        headers = self.prepare_header(data)
-        response = requests.post(url, headers=headers, timeout=self.timeout)
-        return self._response_error_handling(response)
+        return self._send(data['request'],
+                          lambda: self.session.post(url, headers=self.prepare_header(data), timeout=self.timeout))
+
+    def _send(self, request, send):
+        """Call given send function returning HTTP response within the rate limit of the given request endpoint and
+        return handled response. Retry on ERR_RATE_LIMIT with jittered exponential backoff"""
+        key = self.rate_limit_key(request)
+        for attempt in range(self.rate_limit_retries + 1):
+            self.rate_limiter.acquire(key)
+            try:
+                return self._response_error_handling(send())
+            except ApiErrorRateLimit as e:
+                self.rate_limiter.retry(key, e, attempt, self.rate_limit_retries, self.backoff_base, self.backoff_cap)
 
     @staticmethod
     def _response_error_handling(response):
@@ -174,9 +256,16 @@ class BitfinexV1(object):
             raise ApiError(json.dumps(result))
         return result
 
+    def nonce(self) -> str:
+        """Return the next nonce of the signed request: current time in 1e-5 seconds, strictly increasing even if
+        called many times at once (thread-safe) or if the clock goes back"""
+        with self.__nonce_lock:
+            self.__nonce = max(self.__nonce + 1, round(time.time() * 100000))
+            return "{0:d}".format(self.__nonce)
+
     def prepare_header(self, data):
         """Add data to header for authentication purpose"""
-        data['nonce'] = "{0:d}".format(round(time.time() * 100000))
+        data['nonce'] = self.nonce()
         payload = base64.b64encode(json.dumps(data, separators=(',', ':')).encode())
         signature = hmac.new(bytes(self.api_secret, "utf-8"), payload, hashlib.sha384).hexdigest()
         return {
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Store CandlesCache class"""
+import json
+import os
+import time
+from timeframeds import TimeframeArchive, TimeframeDataset
+from .bfx_helper import BitfinexHelper
+from .bitfinex_timeframe import BitfinexTimeframe
+from .candles_downloader import CandlesDownloader
+
+
+class CandlesCache(object):
+    """Local on-disk cache of the Bitfinex candles history. Candles of every (symbol, timeframe) pair are stored in the
+    TimeframeArchive file together with the list of the time ranges already fetched (covered), so requested ranges are
+    fetched only in the uncovered parts (bars skipped by Bitfinex in the covered ranges are not refetched). Bars newer
+    then the cached ones are appended to the archive, the archive is rebuilt only when holes are filled. Closed bars
+    never expire, the open (current) bar is never cached and is fetched on every request including it, so requests of
+    the past ranges are served without HTTP calls. Usage:
+        with CandlesDownloader() as downloader:
+            cache = CandlesCache('~/.cache/bitfinex', downloader)
+            ds = cache.get('tBTCUSD', '1h', start=1577836800, end=1609459200)
+    """
+
+    @property
+    def directory(self) -> str:
+        return self.__directory
+
+    @property
+    def downloader(self) -> CandlesDownloader:
+        return self.__downloader
+
+    def __init__(self, directory: str, downloader=None):
+        """directory: cache files directory (created if needed); downloader: CandlesDownloader used to fetch candles
+        (new one is created by default)"""
+        self.__directory = os.path.expanduser(directory)
+        self.__downloader = downloader or CandlesDownloader()
+        os.makedirs(self.__directory, exist_ok=True)
+
+    def path(self, symbol: str, timeframe: str) -> str:
+        """Return path of the cache file (without extension) for the given symbol and timeframe"""
+        name = '{}_{}'.format(symbol, BitfinexTimeframe(timeframe).timeframe)
+        return os.path.join(self.directory, name.replace(':', '-').replace('/', '-'))
+
+    def covered(self, symbol: str, timeframe: str) -> list:
+        """Return sorted list of (start, end) tuples of the cached time ranges (start <= bar start < end, in seconds)
+        for the given symbol and timeframe"""
+        path = self.path(symbol, timeframe) + '.json'
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [tuple(rng) for rng in json.load(f)['covered']]
+
+    @staticmethod
+    def uncovered(covered: list, start: int, end: int) -> list:
+        """Return list of (start, end) tuples of the parts of the given time range not covered by the given sorted
+        covered ranges"""
+        ranges = []
+        for covered_start, covered_end in covered:
+            if covered_end <= start or covered_start >= end:
+                continue
+            if covered_start > start:
+                ranges.append((start, covered_start))
+            start = max(start, covered_end)
+        if start < end:
+            ranges.append((start, end))
+        return ranges
+
+    @staticmethod
+    def cover(covered: list, start: int, end: int) -> list:
+        """Return sorted list of the given covered ranges joined with the given time range"""
+        ranges = []
+        for rng in sorted(covered + [(start, end)]):
+            if ranges and rng[0] <= ranges[-1][1]:
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], rng[1]))
+            else:
+                ranges.append(tuple(rng))
+        return ranges
+
+    def get(self, symbol: str, timeframe: str, start: int, end=None):
+        """Return TimeframeDataset (MTS in milliseconds) with candles of the given symbol and timeframe started at
+        start <= timestamp < end (in seconds, up to the open bar inclusive by default). Uncovered ranges of closed
+        bars are fetched and stored into the cache, the open bar is fetched if requested"""
+        timeframe = BitfinexTimeframe(timeframe)
+        current = timeframe.span(time.time())
+        end = end if end is not None else current[1]
+        path = self.path(symbol, timeframe.timeframe)
+        covered = self.covered(symbol, timeframe.timeframe)
+        missing = self.uncovered(covered, start, min(end, current[0]))
+        if missing:
+            archive = TimeframeArchive(path + '.tfda') if covered else None
+            fetched = []
+            for missing_start, missing_end in missing:
+                fetched.append(self.downloader.download(symbol, timeframe.timeframe, missing_start, missing_end))
+                covered = self.cover(covered, missing_start, missing_end)
+            if archive is not None and (not archive.blocks or missing[0][0] * 1000 > archive.blocks[-1]['end']):
+                for ds in fetched:  # only bars after the cached ones are fetched
+                    archive.append(ds)
+                self._save_covered(path, covered)
+            else:
+                ds = archive.read(columnar=False) if archive is not None else fetched.pop(0)
+                for other in fetched:
+                    ds.merge(other)
+                self._save(path, ds, covered)
+        if os.path.exists(path + '.tfda'):
+            ds = TimeframeArchive(path + '.tfda').read(start, end, columnar=False)
+        else:
+            ds = TimeframeDataset([], columns=BitfinexHelper.candle_indexes(), tsname='MTS',
+                                  timeframe=timeframe.timeframe, tsunit='ms')
+        if end > current[0]:
+            ds.merge(self.downloader.download(symbol, timeframe.timeframe, max(start, current[0]), end))
+        return ds
+
+    @classmethod
+    def _save(cls, path: str, ds, covered: list):
+        """Write given dataset and covered ranges into the cache files with the given path (without extension), the
+        files are replaced atomically, data first"""
+        TimeframeArchive.write(path + '.tfda.tmp', ds)
+        os.replace(path + '.tfda.tmp', path + '.tfda')
+        cls._save_covered(path, covered)
+
+    @staticmethod
+    def _save_covered(path: str, covered: list):
+        """Write given covered ranges into the cache file with the given path (without extension) atomically"""
+        with open(path + '.json.tmp', 'w') as f:
+            json.dump({'covered': covered}, f)
+        os.replace(path + '.json.tmp', path + '.json')
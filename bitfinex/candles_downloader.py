@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Store CandlesDownloader class"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from timeframeds import TimeframeDataset, TimeframeDatasetError, TimeframeDatasetFile, plan_backfill
+from .bfx_helper import BitfinexHelper
+from .bitfinex_timeframe import BitfinexTimeframe
+from .bitfinexv1 import ApiError, ApiErrorRateLimit, BitfinexV1
+from .rate_limiter import RateLimiter
+
+
+class CandlesDownloader(object):
+    """Download candles history from Bitfinex API v2 candles endpoint (see BitfinexHelper.apiv2_description) into
+    TimeframeDataset (columns are BitfinexHelper.candle_indexes(), MTS in milliseconds). Time range is split into
+    pages of page_size bars, pages are fetched concurrently within the endpoint rate limit. Only closed bars are
+    downloaded by default. Note that Bitfinex skips bars without trades. Usage:
+        with CandlesDownloader(concurrency=4) as downloader:
+            ds = downloader.download('tBTCUSD', '1h', start=1577836800)
+            f = downloader.download_to_file('btcusd-1m.tfds', 'tBTCUSD', '1m', start=1577836800)  # resumable
+    """
+
+    api_url = 'https://api-pub.bitfinex.com'
+    page_size = 10000
+    """Maximum number of candles the API returns in one response"""
+
+    @property
+    def session(self):
+        return self.__session
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self.__rate_limiter
+
+    def __init__(self, concurrency=4, retries=3, backoff=0.3, rate_limiter=None):
+        """concurrency: maximum number of pages fetched at once; rate_limiter: RateLimiter shared with other clients
+        (new one with the candles endpoint rate limit is created by default, key 'candles'); see BitfinexV1 for other
+        parameters"""
+        self.concurrency = concurrency
+        self.timeout = BitfinexV1.timeout
+        self.rate_limit_retries = BitfinexV1.rate_limit_retries
+        self.__session = BitfinexV1.create_session(concurrency, retries, backoff)
+        self.__rate_limiter = rate_limiter or RateLimiter(
+            {'candles': BitfinexHelper.apiv2_description['rpe_candles']['rate_limit']})
+        self.__executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def url(self, symbol: str, timeframe: str, section='hist') -> str:
+        """Return candles endpoint URL for the given symbol (e.g. 'tBTCUSD'), timeframe and section ('hist' or
+        'last')"""
+        endpoint = self.api_url + '/' + BitfinexHelper.apiv2_description['rpe_candles']['endpoint'].split('/', 3)[3]
+        endpoint = endpoint.replace('TimeFrame', BitfinexTimeframe(timeframe).timeframe)
+        return endpoint.replace('Symbol', symbol).replace('Section', section)
+
+    def fetch(self, symbol: str, timeframe: str, start: int, end: int, limit=None) -> list:
+        """Return list of candles of the given symbol and timeframe started at start <= timestamp < end (in seconds),
+        sorted by MTS. No more then limit (page_size by default) candles are returned"""
+        params = {'start': start * 1000, 'end': end * 1000 - 1, 'limit': limit or self.page_size, 'sort': 1}
+        url = self.url(symbol, timeframe)
+        for attempt in range(self.rate_limit_retries + 1):
+            self.rate_limiter.acquire('candles')
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            try:
+                return self._response_error_handling(response)
+            except ApiErrorRateLimit as e:
+                self.rate_limiter.retry('candles', e, attempt, self.rate_limit_retries, BitfinexV1.backoff_base,
+                                        BitfinexV1.backoff_cap)
+
+    @staticmethod
+    def _response_error_handling(response) -> list:
+        if response.status_code != 200:
+            text = response.text
+            result = {'status_code': response.status_code, 'error': text}
+            if response.status_code == 429 or 'ERR_RATE' in text:
+                raise ApiErrorRateLimit(json.dumps(result))
+            raise ApiError(json.dumps(result))
+        return response.json()
+
+    def pages(self, timeframe: str, start: int, end=None) -> list:
+        """Return list of pages requests {'start': start, 'end': end, 'limit': bars} (see plan_backfill()) covering
+        bars started at start <= timestamp < end (in seconds, the current open bar start by default)"""
+        timeframe = BitfinexTimeframe(timeframe)
+        end = end if end is not None else timeframe.span(time.time())[0]
+        first = timeframe.span(start)[0]
+        start = int(timeframe.shift(first)) if first < start else first  # first bar started not before start
+        return plan_backfill([(start, end)], timeframe.timeframe, self.page_size) if start < end else []
+
+    def iterate(self, symbol: str, timeframe: str, start: int, end=None):
+        """Fetch pages of candles concurrently and yield them (lists of candles) in the time order"""
+        return self.__executor.map(lambda page: self.fetch(symbol, timeframe, page['start'], page['end'],
+                                                           page['limit']), self.pages(timeframe, start, end))
+
+    def download(self, symbol: str, timeframe: str, start: int, end=None) -> TimeframeDataset:
+        """Return TimeframeDataset with candles of the given symbol and timeframe started at start <= timestamp < end
+        (in seconds, the current open bar start by default)"""
+        rows = []
+        for candles in self.iterate(symbol, timeframe, start, end):
+            rows.extend(candles)
+        return TimeframeDataset(rows, columns=BitfinexHelper.candle_indexes(), tsname='MTS',
+                                timeframe=BitfinexTimeframe(timeframe).timeframe, tsunit='ms')
+
+    def download_to_file(self, path: str, symbol: str, timeframe: str, start: int, end=None) -> TimeframeDatasetFile:
+        """Download candles into the TimeframeDatasetFile with the given path, page by page in the time order. If the
+        file exists, download is resumed from the bar after the last stored one, so interrupted download can be
+        restarted with the same arguments"""
+        timeframe = BitfinexTimeframe(timeframe).timeframe
+        if os.path.exists(path):
+            tfdf = TimeframeDatasetFile(path)
+            if tfdf.timeframe != timeframe:
+                raise TimeframeDatasetError("File {} contains {} candles, not {}!".format(
+                    path, tfdf.timeframe, timeframe))
+            if len(tfdf):
+                start = max(start, int(tfdf.records()[-1]['MTS']) // 1000 + 1)
+        else:
+            tfdf = TimeframeDatasetFile.create(path, BitfinexHelper.candle_indexes(), 'MTS', timeframe, 'ms')
+        for candles in self.iterate(symbol, timeframe, start, end):
+            if candles:
+                tfdf.append(candles)
+        return tfdf
+
+    def close(self):
+        """Close HTTP session and stop the thread pool"""
+        self.__executor.shutdown(wait=False)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
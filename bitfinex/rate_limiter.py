@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Store TokenBucket and RateLimiter classes for the client-side API rate limiting"""
+import random
+import threading
+import time
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket: tokens are refilled with given rate (tokens per second) up to capacity. Calls are
+    never rejected: every call reserves the next token (bucket may go into debt) and waits until the token is refilled,
+    so concurrent callers are served in the order of their calls with the maximum allowed rate"""
+
+    def __init__(self, rate: float, capacity=1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.__tokens = capacity
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def reserve(self, tokens=1.0) -> float:
+        """Reserve given number of tokens and return delay (in seconds) the caller must wait before the call"""
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated) * self.rate)
+            self.__updated = now
+            self.__tokens -= tokens
+            return max(0.0, -self.__tokens / self.rate)
+
+    def acquire(self, tokens=1.0) -> float:
+        """Reserve given number of tokens and wait until they are available. Return waited time in seconds"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def pause(self, seconds: float):
+        """Drain the bucket, so the next token is available only after given number of seconds (e.g. after the server
+        rate limit error)"""
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.__tokens + (now - self.__updated) * self.rate, 1 - seconds * self.rate)
+            self.__updated = now
+
+
+class RateLimiter(object):
+    """Thread-safe rate limiter keyed by endpoint: every key has own TokenBucket allowing limits[key] (or default)
+    calls per period seconds. Usage:
+        limiter = RateLimiter({'pubticker': 20, 'book': 30}, default=10)
+        limiter.acquire('pubticker')  # waits if needed
+        response = requests.get(...)
+    """
+
+    def __init__(self, limits: dict, default=10, period=60.0, burst=1.0):
+        """limits: dictionary of maximum numbers of calls per period by keys; default: limit for the other keys;
+        burst: bucket capacity (number of calls that can be done at once after the idle time)"""
+        self.limits = dict(limits)
+        self.default = default
+        self.period = period
+        self.burst = burst
+        self.__buckets = {}
+        self.__lock = threading.Lock()
+
+    def bucket(self, key: str) -> TokenBucket:
+        """Return token bucket for the given key, create it if needed"""
+        with self.__lock:
+            if key not in self.__buckets:
+                self.__buckets[key] = TokenBucket(self.limits.get(key, self.default) / self.period, self.burst)
+            return self.__buckets[key]
+
+    def reserve(self, key: str) -> float:
+        """Reserve the call for the given key and return delay (in seconds) the caller must wait before the call
+        (for callers that wait themselves, e.g. with asyncio.sleep())"""
+        return self.bucket(key).reserve()
+
+    def acquire(self, key: str) -> float:
+        """Wait until the call for the given key is allowed. Return waited time in seconds"""
+        return self.bucket(key).acquire()
+
+    def pause(self, key: str, seconds: float):
+        """Delay all next calls for the given key by given number of seconds"""
+        self.bucket(key).pause(seconds)
+
+    def retry(self, key: str, error: Exception, attempt: int, retries: int, base=1.0, cap=60.0) -> float:
+        """Handle given rate limit error of the given attempt (starting from 0) of the call for the given key: raise the
+        error if all retries are used, otherwise delay all next calls for the key with backoff() and return the
+        delay. Usage:
+            for attempt in range(retries + 1):
+                limiter.acquire(key)
+                try:
+                    return call()
+                except ApiErrorRateLimit as e:
+                    limiter.retry(key, e, attempt, retries)
+        """
+        if attempt >= retries:
+            raise error
+        delay = self.backoff(attempt, base, cap)
+        self.pause(key, delay)
+        return delay
+
+    @staticmethod
+    def backoff(attempt: int, base=1.0, cap=60.0) -> float:
+        """Return delay (in seconds) before the given retry attempt (starting from 0): exponential backoff with full
+        jitter, random value between 0 and min(cap, base * 2 ** attempt)"""
+        return random.uniform(0, min(cap, base * 2 ** attempt))
@@ -1,9 +1,73 @@
+import asyncio
+import base64
+import json
+import os
+import socketserver
+import tempfile
+import threading
+import time
 import unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 from bitfinex import BitfinexHelper as bh
-from bitfinex import BitfinexTimeframe
+from bitfinex import BitfinexTimeframe, BitfinexV1, ApiErrorRateLimit, RateLimiter, AsyncBitfinexV1
+from bitfinex import CandlesDownloader, CandlesCache
 from timeframeds import TimeframeError
 
 
+class LocalApi(socketserver.ThreadingMixIn, HTTPServer):
+    """Local HTTP server answering with the queued (status code, JSON result) responses (or responses returned by
+    the given function of the request path) after given delay"""
+    daemon_threads = True
+
+    def __init__(self, responses, delay=0.0):
+        self.responses = responses if callable(responses) else list(responses)
+        self.requests = []
+        self.headers = []
+        self.delay = delay
+        super().__init__(('127.0.0.1', 0), LocalApiHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.server_port)
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class LocalApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        self.server.headers.append(dict(self.headers))
+        time.sleep(self.server.delay)
+        if callable(self.server.responses):
+            status, result = self.server.responses(self.path)
+        else:
+            status, result = self.server.responses.pop(0) if self.server.responses else (200, {})
+        body = json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+def local_candles(path):
+    """Return local 1m candles API response for the given request path, every 7th bar is skipped (no trades)"""
+    query = {name: int(values[0]) for name, values in parse_qs(urlsplit(path).query).items()}
+    mts = range(-(-query['start'] // 60000) * 60000, query['end'] + 1, 60000)
+    return 200, [[t, 1.0, 2.0, 3.0, 0.5, t / 60000 % 100] for t in mts if t // 60000 % 7][:query['limit']]
+
+
 class TestBitfinex(unittest.TestCase):
 
     def test_candle2dict(self):
@@ -40,3 +104,149 @@ class TestBitfinex(unittest.TestCase):
         # Test incorrect timeframe creation raises exception
         self.assertRaises(TimeframeError, BitfinexTimeframe, '1j')
         self.assertRaises(TimeframeError, BitfinexTimeframe, '4h')
+
+    def test_bitfinexv1_session(self):
+        with BitfinexV1('key', 'secret', pool_size=4, retries=2) as bfx:
+            session = bfx.session
+            adapter = session.get_adapter(bfx.api_url)
+            self.assertEqual(adapter._pool_maxsize, 4)
+            self.assertEqual(adapter.max_retries.total, 2)
+            self.assertIn(503, adapter.max_retries.status_forcelist)
+            self.assertIs(session, bfx.session)  # the same session is reused for all requests
+            adapter.poolmanager.connection_from_url(bfx.api_url)
+            self.assertEqual(len(adapter.poolmanager.pools), 1)
+        self.assertEqual(len(adapter.poolmanager.pools), 0)  # connections are closed on exit
+
+    def test_rate_limiter(self):
+        self.assertEqual(BitfinexV1.rate_limit_key('/v1/pubticker/btcusd'), 'pubticker')
+        self.assertEqual(BitfinexV1.rate_limit_key('/v1/offers/hist'), 'offers/hist')
+        self.assertEqual(BitfinexV1.rate_limit_key('/v1/offers'), 'offers')
+        self.assertEqual(BitfinexV1.rate_limit_key('/v1/lendbook/usd'), 'lendbook')
+
+        limiter = RateLimiter({'a': 50}, default=1000, period=1.0)
+        start = time.monotonic()
+        for i in range(6):
+            limiter.acquire('a')
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)  # 5 intervals of 0.02 seconds after the first call
+        self.assertEqual(limiter.reserve('b'), 0.0)  # keys are limited separately
+        self.assertAlmostEqual(limiter.reserve('b'), 0.001, places=3)
+        limiter.pause('b', 0.5)
+        self.assertAlmostEqual(limiter.reserve('b'), 0.5, places=2)
+        self.assertTrue(all(0 <= RateLimiter.backoff(i, 1, 4) <= min(4, 2 ** i) for i in range(5)))
+        error = ApiErrorRateLimit('ERR_RATE_LIMIT')
+        delay = limiter.retry('c', error, 0, 2, base=0.2)
+        self.assertTrue(0 <= delay <= 0.2)
+        self.assertAlmostEqual(limiter.reserve('c'), delay, places=2)  # next calls are delayed
+        with self.assertRaises(ApiErrorRateLimit):
+            limiter.retry('c', error, 2, 2)
+
+    def test_bitfinexv1_rate_limit_backoff(self):
+        error = (429, {'error': 'ERR_RATE_LIMIT'})
+        api = LocalApi([error, error, (200, {'mid': '100.0'})])
+        with BitfinexV1('key', 'secret', rate_limiter=RateLimiter({}, default=6000)) as bfx:
+            bfx.api_url, bfx.backoff_base = api.url, 0.01
+            self.assertEqual(bfx.get_ticker('btcusd'), {'mid': '100.0'})
+            self.assertEqual(api.requests, ['/v1/pubticker/btcusd'] * 3)
+            api.responses = [error] * (bfx.rate_limit_retries + 1)
+            with self.assertRaises(ApiErrorRateLimit):
+                bfx.account_fees()
+        api.close()
+
+    def test_async_bitfinexv1(self):
+        async def sweep(bfx, symbols):
+            return await asyncio.gather(*[bfx.get_ticker(symbol) for symbol in symbols])
+
+        async def auth(bfx, calls):
+            return await asyncio.gather(*[bfx.account_infos() if i % 2 else bfx.account_fees() for i in range(calls)])
+
+        api = LocalApi([(200, {'mid': str(i)}) for i in range(8)], delay=0.2)
+        bfx = AsyncBitfinexV1(concurrency=8, rate_limiter=RateLimiter({}, default=6000, burst=8))
+        bfx.api_url = api.url
+        loop = asyncio.new_event_loop()
+        start = time.monotonic()
+        tickers = loop.run_until_complete(sweep(bfx, ['s{}'.format(i) for i in range(8)]))
+        self.assertLess(time.monotonic() - start, 0.8)  # requests are sent concurrently
+        self.assertEqual(sorted(ticker['mid'] for ticker in tickers), [str(i) for i in range(8)])
+        self.assertEqual(sorted(api.requests), ['/v1/pubticker/s{}'.format(i) for i in range(8)])
+
+        api.responses = [(429, {'error': 'ERR_RATE_LIMIT'})] * (bfx.rate_limit_retries + 1)
+        bfx.backoff_base = 0.01
+        with self.assertRaises(ApiErrorRateLimit):
+            loop.run_until_complete(bfx.get_symbols())
+
+        # Test concurrent signed requests are sent one by one with strictly increasing nonces
+        api.responses, api.requests, api.headers, api.delay = [], [], [], 0.02
+        loop.run_until_complete(auth(bfx, 8))
+        nonces = [int(json.loads(base64.b64decode(headers['X-BFX-PAYLOAD']))['nonce']) for headers in api.headers]
+        self.assertEqual(len(nonces), 8)
+        self.assertTrue(all(a < b for a, b in zip(nonces, nonces[1:])))
+        self.assertEqual(sorted(api.requests), ['/v1/account_fees'] * 4 + ['/v1/account_infos'] * 4)
+        self.assertEqual(len({bfx.nonce() for _ in range(1000)}), 1000)
+        loop.close()
+        bfx.close()
+        api.close()
+
+    def test_candles_downloader(self):
+        api = LocalApi(local_candles)
+        with CandlesDownloader(concurrency=3, rate_limiter=RateLimiter({}, default=6000)) as downloader:
+            downloader.api_url, downloader.page_size = api.url, 10
+            start = 1600000000  # not aligned to minutes, the first bar is at 1600000020
+            self.assertEqual(downloader.url('tBTCUSD', '1W'), api.url + '/v2/candles/trade:7D:tBTCUSD/hist')
+            ds = downloader.download('tBTCUSD', '1m', start, start + 25 * 60)
+            self.assertEqual(len(api.requests), 3)
+            self.assertTrue(api.requests[0].startswith('/v2/candles/trade:1m:tBTCUSD/hist?start=1600000020000&'))
+            self.assertEqual((ds.tsname, ds.tsunit, ds.timeframe.timeframe), ('MTS', 'ms', '1m'))
+            expected = [t * 60000 for t in range(26666667, 26666667 + 25) if t % 7]
+            self.assertEqual([row[0] for row in ds], expected)
+            self.assertTrue(ds.is_ok())
+
+            # Test download is resumed from the last stored bar
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'btcusd.tfds')
+                downloader.download_to_file(path, 'tBTCUSD', '1m', start, start + 12 * 60)
+                api.requests.clear()
+                tfdf = downloader.download_to_file(path, 'tBTCUSD', '1m', start, start + 25 * 60)
+                self.assertEqual(len(api.requests), 2)
+                self.assertIn('start={}'.format(1600000020000 + 12 * 60000), api.requests[0])
+                self.assertEqual(tfdf.dataset().tolist(), ds.data)
+        api.close()
+
+    def test_candles_cache(self):
+        self.assertEqual(CandlesCache.uncovered([(10, 20), (30, 40)], 0, 35), [(0, 10), (20, 30)])
+        self.assertEqual(CandlesCache.uncovered([(10, 20)], 12, 18), [])
+        self.assertEqual(CandlesCache.cover([(10, 20), (30, 40)], 20, 25), [(10, 25), (30, 40)])
+
+        api = LocalApi(local_candles)
+        with CandlesDownloader(rate_limiter=RateLimiter({}, default=6000)) as downloader, \
+                tempfile.TemporaryDirectory() as directory:
+            downloader.api_url = api.url
+            cache = CandlesCache(directory, downloader)
+            start = 1600000020
+            ds = cache.get('tBTC:USD', '1m', start + 10 * 60, start + 20 * 60)
+            self.assertEqual(len(api.requests), 1)
+            self.assertEqual(len(ds), len([t for t in range(start // 60 + 10, start // 60 + 20) if t % 7]))
+            ds = cache.get('tBTC:USD', '1m', start, start + 30 * 60)
+            self.assertEqual(len(api.requests), 3)  # only uncovered ranges before and after are fetched
+            self.assertIn('start={}&'.format(start * 1000), api.requests[1])
+            self.assertIn('start={}&'.format((start + 20 * 60) * 1000), api.requests[2])
+            expected = [t * 60000 for t in range(start // 60, start // 60 + 30) if t % 7]
+            self.assertEqual([row[0] for row in ds], expected)
+            self.assertEqual((ds.tsname, ds.tsunit, ds.timeframe.timeframe), ('MTS', 'ms', '1m'))
+
+            # Test warm requests make no HTTP calls, and the open bar is always fetched
+            self.assertEqual(cache.get('tBTC:USD', '1m', start + 5 * 60, start + 25 * 60).data, ds.data[4:21])
+            self.assertEqual(len(api.requests), 3)
+            current = 1700000100  # this and the previous bars are not skipped by local_candles()
+            with open(cache.path('tBTC:USD', '1m') + '.tfda', 'rb') as f:
+                data = f.read()
+            with mock.patch('bitfinex.candles_cache.time.time', return_value=current + 30):
+                ds = cache.get('tBTC:USD', '1m', current - 5 * 60)
+                self.assertEqual(len(api.requests), 5)
+                cache.get('tBTC:USD', '1m', current - 5 * 60)
+                self.assertEqual(len(api.requests), 6)
+            self.assertEqual([row[0] for row in ds][-2:], [(current - 60) * 1000, current * 1000])
+            with open(cache.path('tBTC:USD', '1m') + '.tfda', 'rb') as f:
+                self.assertEqual(f.read(len(data)), data)  # newer bars are appended, the archive is not rewritten
+            self.assertIn('start={}&'.format(current * 1000), api.requests[-1])
+            self.assertEqual(cache.covered('tBTC:USD', '1m'), [(start, start + 30 * 60), (current - 5 * 60, current)])
+        api.close()
@@ -1,9 +1,19 @@
 import json
+import os
 import secrets
+import tempfile
+import time
 import random
 import unittest
+from unittest import mock
+import numpy as np
 from timeframeds import Timeframe, TimeframeError
-from timeframeds import TimeframeDataset
+from timeframeds import TimeframeDataset, TimeframeDatasetError
+from timeframeds import ColumnarTimeframeDataset, RingTimeframeDataset, TimeframePyramid, TickAggregator
+from timeframeds import SMA, EMA, ATR, RSI, BollingerBands
+from timeframeds import TimeframeDatasetFile, SharedTimeframeDataset, TimeframePanel, plan_backfill, Backtest
+from timeframeds import TimeframeArchive
+from timeframeds.shared_timeframe_dataset import shared_memory
 
 
 class TestTimeframeds(unittest.TestCase):
@@ -45,6 +55,8 @@ class TestTimeframeds(unittest.TestCase):
                         self.assertIn('timestamp', res)
                         for k, v in item['result'].items():
                             self.assertEqual(res[k], v)
+                        self.assertEqual(tf.starts(item['timestamp']), res['start'])
+                        self.assertEqual(tf.ends(tf.starts(item['timestamp'])), res['end'])
 
                 # Test .fmt() method for the test vectors containing data for such test
                 if 'fmt' in props:
@@ -173,3 +185,693 @@ class TestTimeframeds(unittest.TestCase):
                 self.assertTrue(ds.is_continuous())
                 ds[-1][ds.tsindex] += 1
                 self.assertFalse(ds.is_continuous())
+
+    def test_columnar_timeframe_dataset(self):
+        with open('test/test_vectors/timeframedatasets.json') as json_file:
+            test_vector = json.load(json_file)
+
+        # Test creation of empty ColumnarTimeframeDataset
+        for t in test_vector:
+            ds = ColumnarTimeframeDataset(data=[], columns=t['columns'], tsname=t['tsname'], timeframe=t['timeframe'],
+                                          tsunit=t['tsunit'])
+            self.assertEqual(len(ds), 0)
+            self.assertEqual(ds.tolist(), [])
+
+        # Test ColumnarTimeframeDataset behaves the same as TimeframeDataset
+        for t in test_vector:
+            tfds = TimeframeDataset(data=t['data'], columns=t['columns'], tsname=t['tsname'], timeframe=t['timeframe'],
+                                    tsunit=t['tsunit'])
+            ds = ColumnarTimeframeDataset.from_dataset(tfds)
+            self.assertIsInstance(ds, ColumnarTimeframeDataset)
+            self.assertEqual(ds, t['data'])
+            self.assertEqual(ds.to_dataset(), tfds)
+            self.assertEqual(len(ds), len(t['data']))
+            self.assertEqual(ds.tsindex, t['tsindex'])
+            self.assertAlmostEqual(ds.tscoef, t['tscoef'])
+            self.assertEqual(ds.column(t['tsname']).dtype, np.int64)
+            for column in t['columns']:
+                if column != t['tsname']:
+                    self.assertEqual(ds.column(column).dtype, np.float64)
+            self.assertEqual(ds.nbytes, 8 * len(t['columns']) * len(t['data']))
+
+            self.assertEqual(ds[1], t['data'][1])
+            self.assertEqual(ds[-1], t['data'][-1])
+            slice = ds[1:4]
+            self.assertIsInstance(slice, ColumnarTimeframeDataset)
+            self.assertEqual(slice, t['data'][1:4])
+
+            for index in [2, 4, -1]:
+                self.assertEqual(ds.get_timestamp(index), tfds.get_timestamp(index))
+                for timestamp_format in [None, 'timestamp', 'human', 'iso']:
+                    self.assertEqual(ds.get_dict(index, timestamp_format), tfds.get_dict(index, timestamp_format))
+                self.assertEqual(ds.dict2list(ds.get_dict(index)), t['data'][index])
+
+            for index in [0, 1, -1]:
+                timestamp = tfds.get_timestamp(index)
+                for delta in [-1, 0, 1, tfds.timeframe.duration]:
+                    self.assertEqual(ds.is_inside(timestamp + delta, index), tfds.is_inside(timestamp + delta, index))
+
+            self.assertTrue(ds.is_ok())
+            self.assertTrue(ds.is_last_closed())
+            if ds.timeframe.timecode != 'M':
+                self.assertTrue(ds.is_continuous())
+            self.assertIn('Dataset length: {}'.format(len(t['data'])), ds.summary())
+
+        # Test wrong data raises exception
+        t = test_vector[0]
+        self.assertRaises(TimeframeDatasetError, ColumnarTimeframeDataset, list(reversed(t['data'])), t['columns'],
+                          t['tsname'], t['timeframe'], t['tsunit'])
+        self.assertRaises(TimeframeDatasetError, ColumnarTimeframeDataset, [row[1:] for row in t['data']],
+                          t['columns'], t['tsname'], t['timeframe'], t['tsunit'])
+        self.assertRaises(TimeframeDatasetError, ColumnarTimeframeDataset, [t['data'][1], t['data'][0][1:]],
+                          t['columns'], t['tsname'], t['timeframe'], t['tsunit'])
+
+        # Test rows are validated once
+        with mock.patch.object(TimeframeDataset, 'validate_timestamps', wraps=TimeframeDataset.validate_timestamps) as \
+                validate_timestamps:
+            ColumnarTimeframeDataset(t['data'], t['columns'], t['tsname'], t['timeframe'], t['tsunit'])
+        self.assertEqual(validate_timestamps.call_count, 1)
+
+        # Test current time is used by default (not the module import time)
+        now = time.time()
+        for cls in (TimeframeDataset, ColumnarTimeframeDataset):
+            ds = cls([[int(now) // 60 * 60 - 60, 1.0], [int(now) // 60 * 60, 1.0]], ['ts', 'price'], 'ts', '1m')
+            with mock.patch('time.time', return_value=now):
+                self.assertTrue(ds.is_inside())
+                self.assertFalse(ds.is_inside(index=0))
+
+    def test_timeframe_dataset_validation(self):
+        columns = ['ts', 'price']
+        data = [[0, 1.0], [60, 1.0], [120, 1.0], [300, 1.0], [300, 1.0], [420, 1.0]]
+
+        report = TimeframeDataset.validate_data(data[:3], columns, 'ts', 60)
+        self.assertTrue(report['ok'])
+        self.assertIsNone(report['first_bad_index'])
+        self.assertEqual(len(report['gaps']), 0)
+        self.assertEqual(len(report['duplicates']), 0)
+
+        report = TimeframeDataset.validate_data(data, columns, 'ts', 60)
+        self.assertFalse(report['ok'])
+        self.assertEqual(report['first_bad_index'], 3)
+        self.assertEqual(report['reason'], 'step')
+        self.assertEqual(report['gaps'].tolist(), [3, 5])
+        self.assertEqual(report['duplicates'].tolist(), [300])
+
+        report = TimeframeDataset.validate_data(data, columns, 'ts')
+        self.assertFalse(report['ok'])
+        self.assertEqual(report['first_bad_index'], 4)
+        self.assertEqual(report['reason'], 'order')
+        self.assertFalse(TimeframeDataset.is_data_ok(data, columns, 'ts'))
+
+        report = TimeframeDataset.validate_data([[0, 1.0], [60, 1.0], [120]], columns, 'ts')
+        self.assertEqual((report['first_bad_index'], report['reason']), (2, 'item'))
+        report = TimeframeDataset.validate_data([[0, 1.0], [-60, 1.0]], columns, 'ts')
+        self.assertEqual((report['first_bad_index'], report['reason']), (1, 'negative'))
+
+        ds = TimeframeDataset(data[:4], columns, 'ts', '1m')
+        self.assertTrue(ds.validate()['ok'])
+        self.assertEqual(ds.validate(continuous=True)['gaps'].tolist(), [3])
+        self.assertFalse(ds.is_continuous())
+        self.assertEqual(ColumnarTimeframeDataset.from_dataset(ds).validate(continuous=True)['gaps'].tolist(), [3])
+        self.assertRaises(TimeframeDatasetError, TimeframeDataset, data, columns, 'ts', '1m')
+
+    def test_timeframe_dataset_slices(self):
+        with open('test/test_vectors/timeframedatasets.json') as json_file:
+            t = json.load(json_file)[1]
+        ds = TimeframeDataset(data=t['data'], columns=t['columns'], tsname=t['tsname'], timeframe=t['timeframe'],
+                              tsunit=t['tsunit'])
+        cds = ColumnarTimeframeDataset.from_dataset(ds)
+
+        # Test slices share rows (columns storage) and timeframe with the parent dataset
+        view = ds[-4:]
+        self.assertEqual(view, t['data'][-4:])
+        self.assertIs(view.timeframe, ds.timeframe)
+        self.assertIs(view[0], ds[-4])
+        cview = cds[-4:]
+        self.assertEqual(cview, t['data'][-4:])
+        self.assertEqual(cds[2:8:2], t['data'][2:8:2])
+        self.assertEqual(cview[1:], t['data'][-3:])
+        for column in t['columns']:
+            self.assertTrue(np.shares_memory(cview.column(column), cds.column(column)))
+
+        # Test descending slices are still not allowed
+        self.assertRaises(TimeframeDatasetError, ds.__getitem__, slice(None, None, -1))
+        self.assertRaises(TimeframeDatasetError, cds.__getitem__, slice(None, None, -1))
+
+        # Test copies do not share storage with the parent dataset
+        copy = ds.copy()
+        self.assertEqual(copy, ds)
+        self.assertIsNot(copy[0], ds[0])
+        ccopy = cds[-4:].copy()
+        self.assertEqual(ccopy, t['data'][-4:])
+        self.assertFalse(np.shares_memory(ccopy.column(t['tsname']), cds.column(t['tsname'])))
+
+    def test_timeframe_dataset_lookups(self):
+        with open('test/test_vectors/timeframedatasets.json') as json_file:
+            test_vector = json.load(json_file)
+        for t in test_vector[:2]:
+            tfds = TimeframeDataset(data=t['data'], columns=t['columns'], tsname=t['tsname'], timeframe=t['timeframe'],
+                                    tsunit=t['tsunit'])
+            for ds in [tfds, ColumnarTimeframeDataset.from_dataset(tfds)]:
+                first, second, last = ds.get_timestamp(0), ds.get_timestamp(1), ds.get_timestamp(-1)
+                duration = ds.timeframe.duration
+
+                self.assertEqual(ds.locate(first), 0)
+                self.assertEqual(ds.locate(second - 1), 0)
+                self.assertEqual(ds.locate(second), 1)
+                self.assertEqual(ds.locate(last + duration - 1), len(ds) - 1)
+                self.assertIsNone(ds.locate(first - 1))
+                self.assertIsNone(ds.locate(last + duration))
+
+                self.assertEqual(ds.asof(second + 1), 1)
+                self.assertEqual(ds.asof(last + 10 * duration), len(ds) - 1)
+                self.assertIsNone(ds.asof(first - 1))
+
+                self.assertEqual(ds.between(second, last), t['data'][1:-1])
+                self.assertEqual(ds.between(first - 1, second + 1), t['data'][:2])
+                self.assertEqual(len(ds.between(last + 1, last + 2)), 0)
+
+            # Test vectorized lookups for the columnar dataset
+            ds = ColumnarTimeframeDataset.from_dataset(tfds)
+            timestamps = np.array([first - 1, first, second - 1, last + duration - 1, last + duration])
+            self.assertEqual(ds.locate(timestamps).tolist(), [-1, 0, 0, len(ds) - 1, -1])
+            self.assertEqual(ds.asof(timestamps).tolist(), [-1, 0, 0, len(ds) - 1, len(ds) - 1])
+
+    def test_timeframe_starts(self):
+        timestamps = np.array([1614973900, 1609459200, 1612137599])  # 2021-03-05 19:51:40, 2021-01-01, 2021-01-31
+        expected = {
+            '1W': (['2021-03-01', '2020-12-28', '2021-01-25'], ['2021-03-08', '2021-01-04', '2021-02-01']),
+            '14D': (['2021-02-22', '2020-12-28', '2021-01-25'], ['2021-03-08', '2021-01-11', '2021-02-08']),
+            '1M': (['2021-03-01', '2021-01-01', '2021-01-01'], ['2021-04-01', '2021-02-01', '2021-02-01']),
+        }
+        for timeframe, (starts, ends) in expected.items():
+            tf = Timeframe(timeframe)
+            starts = np.array(starts, dtype='datetime64[s]').astype(int).tolist()
+            ends = np.array(ends, dtype='datetime64[s]').astype(int).tolist()
+            self.assertEqual(tf.starts(timestamps).tolist(), starts)
+            self.assertEqual(tf.ends(tf.starts(timestamps)).tolist(), ends)
+            self.assertEqual([array.tolist() for array in tf.bounds(timestamps)], [starts, ends])
+            self.assertEqual([tf.span(timestamp) for timestamp in timestamps], list(zip(starts, ends)))
+
+        # Test scalar and vectorized borders are the same for all timeframes
+        timestamps = np.arange(1609459200, 1609459200 + 400 * 86400, 9973.5)
+        for timeframe in Timeframe.timeframes():
+            tf = Timeframe(timeframe)
+            starts, ends = tf.bounds(timestamps)
+            spans = [tf.span(timestamp) for timestamp in timestamps]
+            self.assertEqual(spans, list(zip(starts.tolist(), ends.tolist())))
+            borders = tf.borders(timestamps[-1], iso=False)
+            self.assertEqual(len(borders), 7)
+            self.assertEqual((borders['start'], borders['end']), spans[-1])
+            self.assertAlmostEqual(borders['pcnt_passed'] + borders['pcnt_remain'], 100)
+            self.assertIn('iso_start', tf.borders(timestamps[-1]))
+            self.assertTrue(np.array_equal(tf.shift(starts), ends))
+            self.assertTrue(np.array_equal(tf.shift(tf.shift(starts, 3), -3), starts))
+            self.assertTrue(np.all(tf.count(starts, tf.shift(starts, 5)) == 5))
+
+        # Test current time is used by default (not the module import time)
+        tf = Timeframe('1m')
+        tf.span(1609459200)
+        now = time.time()
+        self.assertTrue(tf.span()[0] <= now < tf.span()[1] + 60)
+        self.assertTrue(tf.borders(iso=False)['timestamp'] >= now)
+
+    def test_timeframe_dataset_resample(self):
+        columns = ['MTS', 'OPEN', 'CLOSE', 'HIGH', 'LOW', 'VOLUME']
+        data = [[(1614556800 + i * 60) * 1000, 10 + i, 11 + i, 12 + i * (-1) ** i, 9 - i, 1] for i in range(12)]
+        tfds = TimeframeDataset(data, columns, 'MTS', '1m', tsunit='ms')
+        for ds in [tfds, ColumnarTimeframeDataset.from_dataset(tfds)]:
+            res = ds.resample('5m')
+            self.assertIsInstance(res, ds.__class__)
+            self.assertEqual(res.timeframe.timeframe, '5m')
+            self.assertEqual(list(res), [
+                [1614556800000, 10, 15, 16, 5, 5],
+                [1614557100000, 15, 20, 20, 0, 5],
+                [1614557400000, 20, 22, 22, -2, 2],
+            ])
+            self.assertTrue(res.partial)
+            self.assertTrue(res[1:].partial)
+            self.assertFalse(res[:2].partial)
+            self.assertFalse(ds.resample('5m', partial=False).partial)
+            self.assertEqual(len(ds.resample('5m', partial=False)), 2)
+            self.assertFalse(ds[:10].resample('5m').partial)
+            self.assertEqual(list(ds.resample('1h', how={'VOLUME': 'max'})), [[1614556800000, 10, 22, 22, -2, 1]])
+            self.assertRaises(TimeframeDatasetError, ds.resample, '1m')
+
+    def test_timeframe_dataset_merge(self):
+        columns = ['ts', 'Open', 'Close']
+        rows = [[1600000000 + i * 60, 10.0 + i, 11.0 + i] for i in range(10)]
+        for cls in (TimeframeDataset, ColumnarTimeframeDataset, RingTimeframeDataset):
+            ds = cls(rows[:2] + rows[4:8], columns, 'ts', '1m')
+            ds.partial = True
+
+            # Updated open bar plus new bars
+            update = [rows[7][:2] + [20.0], rows[8]]
+            self.assertEqual(ds.merge(TimeframeDataset(update, columns, 'ts', '1m')), {'inserted': 1, 'updated': 1})
+            self.assertEqual(list(ds)[-2:], update)
+            self.assertFalse(ds.partial)
+
+            # Bars inside the dataset, equal bars are not counted as updated
+            self.assertEqual(ds.merge(rows[1:5], policy='keep'), {'inserted': 2, 'updated': 0})
+            self.assertEqual(list(ds), rows[:7] + update)
+            self.assertEqual(ds.merge(rows[:3], policy='error'), {'inserted': 0, 'updated': 0})
+            with self.assertRaises(TimeframeDatasetError):
+                ds.merge(rows[6:8], policy='error')
+            with self.assertRaises(TimeframeDatasetError):
+                ds.merge(rows, policy='unknown')
+            with self.assertRaises(TimeframeDatasetError):
+                ds.merge(TimeframeDataset([[1600000000 + 600, 1.0, 2.0]], columns, 'ts', '5m'))
+            self.assertEqual(ds.merge(ColumnarTimeframeDataset(rows, columns, 'ts', '1m')),
+                             {'inserted': 1, 'updated': 1})
+            self.assertEqual(list(ds), rows)
+            self.assertTrue(ds.is_ok())
+
+        ds = ColumnarTimeframeDataset(rows[:5], columns, 'ts', '1m')
+        ds.add_indicator(SMA(2, column='Close'))
+        ds.merge([rows[2][:2] + [0.0]] + rows[5:])
+        self.assertTrue(np.allclose(ds.column('SMA2'), SMA(2, column='Close').compute(ds)['SMA2'], equal_nan=True))
+        ring = RingTimeframeDataset(rows[:5], columns, 'ts', '1m', maxlen=4)
+        self.assertEqual(ring.merge([rows[0]] + rows[3:7]), {'inserted': 2, 'updated': 0})  # rows[0] is dropped
+        self.assertEqual(list(ring), rows[3:7])
+        self.assertEqual(ring.merge(rows[:2] + [rows[3][:2] + [0.0]]), {'inserted': 0, 'updated': 1})
+        self.assertEqual(list(ring), [rows[3][:2] + [0.0]] + rows[4:7])
+
+    def test_timeframe_panel(self):
+        start = 1600000000
+        btc = TimeframeDataset([[start, 10.0, 1.0], [start + 60, 11.0, 2.0], [start + 180, 12.0, 3.0]],
+                               ['ts', 'Close', 'Volume'], 'ts', '1m')
+        eth = ColumnarTimeframeDataset([[start + 60, 5.0, 10.0], [start + 120, 6.0, 20.0], [start + 180, 4.0, 30.0]],
+                                       ['ts', 'CLOSE', 'VOLUME'], 'ts', '1m')
+        panel = TimeframePanel({'BTC': btc, 'ETH': eth})
+        self.assertEqual(panel.values.shape, (4, 2, 2))
+        self.assertEqual(panel.timestamps.tolist(), [start, start + 60, start + 120, start + 180])
+        self.assertTrue(np.array_equal(panel.field('close'), [[10, np.nan], [11, 5], [np.nan, 6], [12, 4]],
+                                       equal_nan=True))
+        self.assertEqual(panel.present.tolist(), [[True, False], [True, True], [False, True], [True, True]])
+        self.assertTrue(np.array_equal(panel.rank('Close'), [[0, np.nan], [1, 0], [np.nan, 0], [1, 0]],
+                                       equal_nan=True))
+        self.assertTrue(np.allclose(panel.zscore('Close')[-1], [1, -1]))
+        self.assertTrue(np.allclose(panel.returns('Close')[-1], [np.nan, -1 / 3], equal_nan=True))
+
+        filled = TimeframePanel({'BTC': btc, 'ETH': eth}, fields=['Close'], fill='ffill')
+        self.assertTrue(np.array_equal(filled.field('Close'), [[10, np.nan], [11, 5], [11, 6], [12, 4]],
+                                       equal_nan=True))
+        self.assertEqual(filled.symbol('BTC').tolist(), [[start, 10.0], [start + 60, 11.0], [start + 120, 11.0],
+                                                         [start + 180, 12.0]])
+        self.assertEqual(filled.between(start + 60, start + 180).timestamps.tolist(), [start + 60, start + 120])
+        self.assertEqual(len(filled[-1:]), 1)
+
+        inner = TimeframePanel({'BTC': btc, 'ETH': eth}, join='inner')
+        self.assertEqual(inner.timestamps.tolist(), [start + 60, start + 180])
+        self.assertTrue(inner.present.all())
+        with self.assertRaises(TimeframeDatasetError):
+            TimeframePanel({'BTC': btc, 'ETH': ColumnarTimeframeDataset([], ['ts', 'Close'], 'ts', '5m')})
+        with self.assertRaises(TimeframeDatasetError):
+            TimeframePanel({'BTC': btc, 'ETH': eth}, fields=['Open'])
+        with self.assertRaises(TimeframeDatasetError):
+            TimeframePanel({'BTC': btc}, fill='bfill')
+
+    def test_timeframe_dataset_gaps(self):
+        start = 1600000000 - 1600000000 % 3600
+        missing = set(range(10, 15)) | {40} | set(range(42, 60))
+        rows = [[(start + i * 60) * 1000, 1.0] for i in range(100) if i not in missing]
+        expected = [(start + 600, start + 900), (start + 2400, start + 2460), (start + 2520, start + 3600)]
+        for ds in (TimeframeDataset(rows, ['ts', 'Close'], 'ts', '1m', 'ms'),
+                   ColumnarTimeframeDataset(rows, ['ts', 'Close'], 'ts', '1m', 'ms')):
+            self.assertEqual(ds.gaps(), expected)
+            self.assertEqual(ds.gaps(start - 90, start + 6030),
+                             [(start - 60, start)] + expected + [(start + 6000, start + 6060)])
+            self.assertEqual(ds.gaps(start + 700, start + 2430),
+                             [(start + 720, start + 900), (start + 2400, start + 2460)])
+            self.assertEqual(ds.gaps(start + 7200, start + 7320), [(start + 7200, start + 7320)])
+            self.assertEqual(ds[:0].gaps(start, start + 120), [(start, start + 120)])
+            self.assertEqual(ds[:10].gaps(), [])
+
+        # Test requests cover all missing bars with the minimal number of pages
+        requests = plan_backfill(expected, '1m', 10)
+        self.assertEqual(requests, [{'start': start + 600, 'end': start + 900, 'limit': 5},
+                                    {'start': start + 2400, 'end': start + 3000, 'limit': 10},
+                                    {'start': start + 3000, 'end': start + 3600, 'limit': 10}])
+        self.assertEqual(len(plan_backfill(expected, '1m', 1000)), 1)
+        self.assertEqual(sum(request['limit'] for request in plan_backfill(expected, '1m', 1)), 24)
+        self.assertEqual(plan_backfill(expected, '1m', 20, budget=1, newest_first=True),
+                         [{'start': start + 2400, 'end': start + 3600, 'limit': 20}])
+        self.assertEqual([request['limit'] for request in plan_backfill([(0, 86400 * 365)], '1M', 5)], [5, 5, 2])
+        self.assertEqual(plan_backfill([], '1h', 10), [])
+        with self.assertRaises(TimeframeDatasetError):
+            plan_backfill(expected, '1m', 0)
+
+    def test_backtest(self):
+        closes = [100.0, 110.0, 99.0, 99.0, 108.9, 98.01]
+        ds = TimeframeDataset([[1600000000 + i * 3600, close] for i, close in enumerate(closes)], ['ts', 'Close'], 'ts',
+                              '1h')
+        bt = Backtest(ds, fee=0.01, initial=1000.0)
+        result = bt.run_signals([1.0, np.nan, 0.0, -1.0, np.nan, np.nan])
+        self.assertEqual(result['position'].tolist(), [1.0, 1.0, 0.0, -1.0, -1.0, -1.0])
+        # Buy (fee 10), +10%, -10% and sell (fee 9.801), flat, sell short (fee 9.70299), +10%, -10%
+        expected = [990.0, 1089.0, 970.299, 960.59601, 864.536409, 950.9900499]
+        self.assertTrue(np.allclose(result['equity'], expected))
+        self.assertTrue(np.allclose(result['fees'], [10.0, 0.0, 9.801, 9.70299, 0.0, 0.0]))
+        self.assertTrue(np.allclose(result['returns'][1:], np.array(expected[1:]) / expected[:-1] - 1))
+        stats = result['stats']
+        self.assertEqual((stats['trades'], stats['exposure']), (3, 5 / 6))
+        self.assertAlmostEqual(stats['total_return'], 0.9509900499 - 1)
+        self.assertAlmostEqual(stats['max_drawdown'], 1 - 864.536409 / 1089.0)
+        self.assertAlmostEqual(stats['fees'], 29.50399)
+
+        # Test stateful strategy gives the same results
+        signals = [1.0, None, 0.0, -1.0, None, None]
+        calls = []
+
+        def strategy(index, position, equity):
+            calls.append((position, equity))
+            return signals[index]
+
+        looped = bt.run(strategy)
+        for key in ('position', 'equity', 'fees', 'returns'):
+            self.assertTrue(np.allclose(result[key], looped[key]))
+        for key, value in stats.items():
+            self.assertAlmostEqual(looped['stats'][key], value)
+        self.assertEqual(calls[2][0], 1.0)
+        self.assertAlmostEqual(calls[2][1], 980.1)
+        self.assertEqual(bt.run_signals(np.zeros(6))['stats']['trades'], 0)
+        with self.assertRaises(TimeframeDatasetError):
+            bt.run_signals([1.0])
+        with self.assertRaises(TimeframeDatasetError):
+            Backtest(ds, price='Open')
+
+    def test_timeframe_pyramid(self):
+        columns = ['MTS', 'OPEN', 'CLOSE', 'HIGH', 'LOW', 'VOLUME']
+        rows = [[(1614556800 + i * 60) * 1000, 10 + i % 7, 11 + i % 5, 12 + i % 11, 9 - i % 3, 1 + i % 2]
+                for i in range(3000)]
+        full = ColumnarTimeframeDataset(rows, columns, 'MTS', '1m', tsunit='ms')
+        timeframes = ['1D', '5m', '1h', '4h']
+        pyramid = TimeframePyramid(full[:1000], timeframes)
+        self.assertEqual(pyramid.timeframes, ['5m', '1h', '4h', '1D'])
+        for row in rows[1000:]:
+            updated = list(row)
+            updated[columns.index('HIGH')] += 100
+            pyramid.append(updated)  # new (open) bar
+            pyramid.append(row)  # updated version of the open bar
+        self.assertEqual(pyramid['1m'], full)
+        for timeframe in timeframes:
+            expected = full.resample(timeframe)
+            self.assertEqual(pyramid[timeframe], expected)
+            self.assertEqual(pyramid[timeframe].partial, expected.partial)
+        self.assertRaises(TimeframeDatasetError, pyramid.__getitem__, '1M')
+        self.assertRaises(TimeframeDatasetError, pyramid.append, rows[0])
+
+        # Test pyramid built from scratch
+        pyramid = TimeframePyramid(full[:0], timeframes)
+        pyramid.extend(rows[:500])
+        for timeframe in timeframes:
+            self.assertEqual(pyramid[timeframe], full[:500].resample(timeframe))
+
+    def test_tick_aggregator(self):
+        ticks = [(60, 10, 1), (70, 12, -2), (119, 9, 1), (180, 11, 3), (185, 8, 1), (300, 10, 1), (301, 13, 5)]
+        expected = [[60, 10, 12, 9, 9, 4], [180, 11, 11, 8, 8, 4]]
+
+        # Test single ticks and batches give the same bars
+        closed = []
+        single = TickAggregator('1m', callback=closed.append)
+        for tick in ticks:
+            single.add(*tick)
+        self.assertEqual(single.dataset, expected)
+        self.assertEqual(closed, expected)
+        self.assertEqual(single.open_bar, [300, 10, 13, 10, 13, 6])
+        batched = TickAggregator('1m')
+        batched.add_batch(*zip(*ticks[:4]))
+        batched.add_batch(*zip(*ticks[4:]))
+        self.assertEqual(batched.dataset, expected)
+        self.assertEqual(batched.open_bar, single.open_bar)
+        consumed = TickAggregator('1m')
+        consumed.consume(iter(ticks), batch_size=3)
+        self.assertEqual(consumed.dataset, expected)
+
+        # Test late ticks are dropped and open bar is closed by flush()
+        consumed.add(100, 1, 1)
+        consumed.add_batch([120, 301], [1, 1], [1, 1])
+        self.assertEqual(consumed.late, 2)
+        consumed.flush(359)
+        self.assertEqual(len(consumed.dataset), 2)
+        consumed.flush(360)
+        self.assertEqual(consumed.dataset, expected + [[300, 10, 13, 1, 1, 7]])
+        self.assertIsNone(consumed.open_bar)
+
+        # Test ticks of the last closed bar are late after flush() and for the given non-empty dataset
+        flushed = TickAggregator('1m')
+        flushed.add(60, 10, 1)
+        flushed.add(70, 12, 1)
+        flushed.flush()
+        flushed.add(90, 11, 1)
+        flushed.add(130, 13, 1)
+        flushed.add_batch([100, 110, 140], [1, 1, 14], [1, 1, 1])
+        flushed.add(190, 15, 1)
+        self.assertEqual(flushed.late, 3)
+        self.assertEqual(flushed.dataset, [[60, 10, 12, 10, 12, 2], [120, 13, 14, 13, 14, 2]])
+        resumed = TickAggregator('1m', dataset=flushed.dataset.copy())
+        resumed.add_batch([150, 170, 185], [1, 1, 16], [1, 1, 1])
+        resumed.add(179, 1, 1)
+        resumed.add(240, 17, 1)
+        self.assertEqual(resumed.late, 3)
+        self.assertEqual(resumed.dataset.get_dict(-1)['Open'], 16)
+        self.assertEqual(len(resumed.dataset), 3)
+
+        # Test Bitfinex-like columns and milliseconds timestamps
+        aggregator = TickAggregator('5m', columns=['MTS', 'OPEN', 'CLOSE', 'HIGH', 'LOW', 'VOLUME'], tsname='MTS',
+                                    tsunit='ms')
+        aggregator.add_batch([timestamp * 1000 for timestamp, _, _ in ticks], [p for _, p, _ in ticks],
+                             [a for _, _, a in ticks])
+        self.assertEqual(aggregator.dataset, [[0, 10, 8, 12, 8, 8]])
+        self.assertRaises(TimeframeDatasetError, TickAggregator, '1m', columns=['Timestamp', 'Price'])
+
+    def test_ring_timeframe_dataset(self):
+        columns = ['ts', 'price']
+        rows = [[i * 60, float(i)] for i in range(100)]
+        ds = RingTimeframeDataset(rows[:3], columns, 'ts', '1m', maxlen=10)
+        self.assertEqual(ds, rows[:3])
+        buffers = {column: ds.column(column).base for column in columns}
+        for row in rows[3:25]:
+            ds.append(row)
+            self.assertEqual(ds[-1], row)
+        self.assertEqual(len(ds), 10)
+        self.assertEqual(ds, rows[15:25])
+        self.assertEqual(ds.get_dict(-1), {'ts': 24 * 60, 'price': 24.0})
+        self.assertTrue(ds.is_last_closed())
+        self.assertTrue(ds.is_continuous())
+        ds.amend([24 * 60, 100.0])
+        self.assertEqual(ds[-1], [24 * 60, 100.0])
+        self.assertEqual(ds[-3:].copy(), [rows[22], rows[23], [24 * 60, 100.0]])
+        ds.extend(rows[25:32])
+        self.assertEqual(ds, [rows[22], rows[23], [24 * 60, 100.0]] + rows[25:32])
+        ds.extend(rows[32:])
+        self.assertEqual(ds, rows[90:])
+        for column in columns:
+            self.assertIs(ds.column(column).base, buffers[column])  # storage is never reallocated
+
+        self.assertEqual(RingTimeframeDataset(rows, columns, 'ts', '1m', maxlen=5), rows[-5:])
+        self.assertRaises(TimeframeDatasetError, ds.append, rows[0])
+        self.assertRaises(TimeframeDatasetError, ds.amend, rows[0])
+        self.assertRaises(TimeframeDatasetError, RingTimeframeDataset, rows, columns, 'ts', '1m', maxlen=0)
+
+    def test_indicators(self):
+        columns = ['ts', 'Open', 'High', 'Low', 'Close', 'Volume']
+        closes = [10 + (i * 7) % 13 - (i * 3) % 5 for i in range(300)]
+        rows = [[i * 60, c, c + 1 + i % 3, c - 1 - i % 2, c + 0.5, 1.0] for i, c in enumerate(closes)]
+
+        def indicators():
+            return [SMA(5), EMA(5), ATR(5), RSI(5), BollingerBands(5, k=2)]
+
+        full = ColumnarTimeframeDataset(rows, columns, 'ts', '1m')
+        for indicator in indicators():
+            full.add_indicator(indicator)
+        live = ColumnarTimeframeDataset(rows[:3], columns, 'ts', '1m')
+        ring = RingTimeframeDataset(rows[:3], columns, 'ts', '1m', maxlen=20)
+        for ds in [live, ring]:
+            for indicator in indicators():
+                ds.add_indicator(indicator)
+            for row in rows[3:200]:
+                updated = list(row)
+                updated[columns.index('Close')] += 10
+                ds.append(updated)
+                ds.amend(row)
+            for index in range(200, 300, 10):
+                ds.extend(rows[index:index + 10])
+        extended = ColumnarTimeframeDataset(rows[:2], columns, 'ts', '1m')
+        for indicator in indicators():
+            extended.add_indicator(indicator)
+        extended.extend(rows[2:])  # indicators are recomputed vectorized
+
+        # Test incremental values are the same as vectorized ones
+        names = [name for indicator in full.indicators for name in indicator.names]
+        self.assertEqual(names, ['SMA5', 'EMA5', 'ATR5', 'RSI5', 'BB5_middle', 'BB5_upper', 'BB5_lower'])
+        for name in names:
+            self.assertTrue(np.allclose(full.column(name), live.column(name), equal_nan=True))
+            self.assertTrue(np.allclose(full.column(name), extended.column(name), equal_nan=True))
+            self.assertTrue(np.allclose(full.column(name)[-20:], ring.column(name)))
+            self.assertTrue(np.all(np.isnan(full.column(name)[:4])))
+
+        # Test values against straightforward calculations
+        close = np.array(closes) + 0.5
+        self.assertAlmostEqual(full.get_dict(-1)['SMA5'], close[-5:].mean())
+        self.assertAlmostEqual(full.get_dict(-1)['BB5_upper'], close[-5:].mean() + 2 * close[-5:].std())
+        ema = close[0]
+        for value in close[1:]:
+            ema += (value - ema) / 3
+        self.assertAlmostEqual(live.get_dict(-1)['EMA5'], ema)
+        rsi = full.column('RSI5')
+        self.assertTrue(np.all((rsi[5:] >= 0) & (rsi[5:] <= 100)))
+        self.assertEqual(len(full.copy().indicators), 0)
+
+        # Test long run of incremental Bollinger bands stays precise for big prices with small variance
+        walk = np.round(10000 + np.cumsum(np.random.RandomState(1).normal(0, 0.5, 30000)), 2) + 1e6
+        rows = [[i * 60, c, c, c, c, 1.0] for i, c in enumerate(walk.tolist())]
+        live = ColumnarTimeframeDataset(rows[:30], columns, 'ts', '1m')
+        live.add_indicator(BollingerBands(20))
+        for row in rows[30:]:
+            live.append(row)
+        expected = BollingerBands(20).compute(live)
+        for name in ('BB20_middle', 'BB20_upper'):
+            self.assertTrue(np.allclose(live.column(name)[19:], expected[name][19:], rtol=0, atol=1e-6))
+        self.assertAlmostEqual(live.get_dict(-1)['BB20_upper'] - live.get_dict(-1)['BB20_middle'],
+                               2 * walk[-20:].std(), places=6)
+
+    def test_timeframe_dataset_file(self):
+        columns = ['ts', 'Open', 'High', 'Low', 'Close', 'Volume']
+        rows = [[1600000000 + i * 60, 10.0 + i, 12.0 + i, 9.0 + i, 11.0 + i, 1.0 * i] for i in range(100)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'test.tfds')
+            tfdf = TimeframeDatasetFile.write(path, TimeframeDataset(rows[:50], columns, 'ts', '1m'))
+            self.assertEqual(os.path.getsize(path), TimeframeDatasetFile.HEADER_SIZE + 50 * 6 * 8)
+            tfdf.append(ColumnarTimeframeDataset(rows[50:80], columns, 'ts', '1m'))
+            tfdf.append(rows[80:])
+            with self.assertRaises(TimeframeDatasetError):
+                tfdf.append(rows[-1:])
+
+            # Test file is reopened with the same settings and data
+            tfdf = TimeframeDatasetFile(path)
+            self.assertEqual((tfdf.columns, tfdf.tsname, tfdf.timeframe, tfdf.tsunit), (columns, 'ts', '1m', 's'))
+            ds = tfdf.dataset()
+            self.assertEqual(len(tfdf), 100)
+            self.assertEqual(ds.tolist(), rows)
+            self.assertTrue(ds.is_ok())
+            self.assertEqual(ds.get_dict(-1)['Close'], 110.0)
+            with self.assertRaises(ValueError):
+                ds.column('Close')[0] = 0.0  # memory-mapped dataset is read-only
+            changed = ds.copy()
+            changed.append([rows[-1][0] + 60] + rows[-1][1:])
+            self.assertEqual(len(changed), 101)
+
+            # Test incomplete trailing record is ignored and overwritten by the next append
+            with open(path, 'ab') as f:
+                f.write(b'\x00' * 10)
+            self.assertEqual(len(TimeframeDatasetFile(path)), 100)
+            tfdf.append([[rows[-1][0] + 60] + rows[-1][1:]])
+            self.assertEqual(tfdf.dataset().tolist()[-1][0], rows[-1][0] + 60)
+            self.assertEqual(os.path.getsize(path), TimeframeDatasetFile.HEADER_SIZE + 101 * 6 * 8)
+
+            empty = TimeframeDatasetFile.create(path, columns, 'ts', '1h', 'ms')
+            self.assertEqual(len(empty.dataset()), 0)
+            with open(path, 'wb') as f:
+                f.write(b'garbage')
+            with self.assertRaises(TimeframeDatasetError):
+                TimeframeDatasetFile(path)
+
+    def test_timeframe_archive(self):
+        columns = ['ts', 'Open', 'High', 'Low', 'Close', 'Volume']
+        rows = [[1600000000 + i * 60 + (600 if i >= 70 else 0), 9000.5 + i * 0.1, 9001.25 + i, 8999.0 - i, 9000.0,
+                 0.12345678 * i] for i in range(100)]
+        rows[30][5] = float('nan')
+        rows[40][1] = 1 / 3
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'test.tfda')
+            archive = TimeframeArchive.write(path, TimeframeDataset(rows[:50], columns, 'ts', '1m'), block_size=16)
+            archive.append(ColumnarTimeframeDataset(rows[50:80], columns, 'ts', '1m'))
+            archive.append(rows[80:])
+            with self.assertRaises(TimeframeDatasetError):
+                archive.append(rows[-1:])
+
+            # Test archive is reopened with the same settings and data, values are encoded losslessly
+            archive = TimeframeArchive(path)
+            self.assertEqual((archive.columns, archive.tsname, archive.timeframe, archive.tsunit),
+                             (columns, 'ts', '1m', 's'))
+            # 50 rows give blocks of 16, 16, 16 and 2 rows, the 2 rows block is re-encoded with the next 30 rows
+            self.assertEqual([block['rows'] for block in archive.blocks], [16, 16, 16, 16, 16, 16, 4])
+            encodings = [column['encoding'] for column in archive.blocks[0]['columns']]
+            self.assertEqual(encodings, ['dod', 'delta', 'delta', 'delta', 'delta', 'delta'])
+            self.assertEqual(archive.blocks[1]['columns'][5]['encoding'], 'raw')  # NaN
+            self.assertEqual(archive.blocks[2]['columns'][1]['encoding'], 'raw')  # too many decimals
+            ds = archive.read()
+            self.assertIsInstance(ds, ColumnarTimeframeDataset)
+            self.assertTrue(ds.is_ok())
+            self.assertTrue(np.isnan(ds.column('Volume')[30]))
+            self.assertEqual(str(ds.tolist()), str(rows))  # str() to compare NaN
+
+            # Test time range reads
+            self.assertEqual(archive.read(rows[10][0], rows[20][0], columnar=False).data, rows[10:20])
+            self.assertEqual(archive.read(rows[69][0] + 1).tolist(), rows[70:])
+            self.assertEqual(archive.read(end=rows[0][0] + 1).tolist(), rows[:1])
+            self.assertEqual(len(archive.read(rows[69][0] + 60, rows[70][0])), 0)
+
+            # Test interrupted append leaves the previous footer usable and the next append overwrites its garbage
+            class InterruptedArchive(TimeframeArchive):
+                @classmethod
+                def _write_index(cls, f, blocks):
+                    f.write(b'partial index' + TimeframeArchive.MAGIC)
+                    raise OSError('Disk is full')
+
+            size = os.path.getsize(path)
+            with self.assertRaises(OSError):
+                InterruptedArchive(path).append([[rows[-1][0] + 60] + rows[-1][1:]])
+            self.assertGreater(os.path.getsize(path), size)
+            self.assertEqual(os.listdir(directory), ['test.tfda'])
+            archive = TimeframeArchive(path)
+            self.assertEqual(str(archive.read().tolist()), str(rows))
+
+            # Test small appends re-encode the trailing block and never overwrite the previous data
+            with open(path, 'rb') as f:
+                data = f.read(size)
+            for i in range(1, 21):
+                archive.append([[rows[-1][0] + i * 60] + rows[-1][1:]])
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(len(data)), data)
+                    f.seek(0)
+                    data = f.read()
+            self.assertEqual([block['rows'] for block in archive.blocks], [16] * 7 + [8])
+            self.assertEqual(TimeframeArchive(path).blocks, archive.blocks)
+            size = os.path.getsize(path)
+            archive.compact()
+            self.assertLess(os.path.getsize(path), size)
+            self.assertEqual(os.listdir(directory), ['test.tfda'])
+            self.assertEqual(len(archive.blocks), 8)
+            self.assertEqual(str(TimeframeArchive(path).read().tolist()[:100]), str(rows))
+            self.assertEqual(len(archive.read()), 120)
+
+            empty = TimeframeArchive.create(path, columns, 'ts', '1h', 'ms')
+            self.assertEqual(len(empty.read()), 0)
+            with open(path, 'wb') as f:
+                f.write(b'garbage')
+            with self.assertRaises(TimeframeDatasetError):
+                TimeframeArchive(path)
+
+    @unittest.skipIf(shared_memory is None, 'shared memory needs Python 3.8+')
+    def test_shared_timeframe_dataset(self):
+        columns = ['ts', 'Open', 'High', 'Low', 'Close', 'Volume']
+        rows = [[1600000000 + i * 60, 10.0 + i, 12.0 + i, 9.0 + i, 11.0 + i, 1.0 * i] for i in range(100)]
+        with SharedTimeframeDataset.publish(TimeframeDataset(rows, columns, 'ts', '1m')) as shared:
+            descriptor = shared.descriptor
+            self.assertEqual(json.loads(json.dumps(descriptor)), descriptor)
+            with SharedTimeframeDataset.attach(descriptor) as attached:
+                self.assertFalse(attached.owner)
+                ds = attached.dataset()
+                self.assertEqual(ds.tolist(), rows)
+                self.assertEqual((ds.tsname, ds.timeframe.timeframe, ds.tsunit), ('ts', '1m', 's'))
+                with self.assertRaises(ValueError):
+                    ds.column('Close')[0] = 0.0
+                self.assertEqual(ds.resample('5m').get_dict(0)['High'], 15.0)
+                changed = ds.copy()
+                changed.amend([rows[-1][0], 0.0, 0.0, 0.0, 0.0, 0.0])
+                self.assertEqual(shared.dataset().get_dict(-1)['Close'], 110.0)
+                del ds
+        with self.assertRaises(FileNotFoundError):
+            SharedTimeframeDataset.attach(descriptor)
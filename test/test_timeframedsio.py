@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from timeframeds import TimeframeDataset, TimeframeDatasetError, ColumnarTimeframeDataset
+import timeframedsio
+
+
+class TestTimeframedsio(unittest.TestCase):
+
+    def setUp(self):
+        self.columns = ['ts', 'Open', 'High', 'Low', 'Close', 'Volume']
+        self.rows = [[1600000000000 + i * 60000, 10.0 + i, 12.0 + i, 9.0 + i, 11.0 + i, 1.0 * i] for i in range(100)]
+        self.ds = ColumnarTimeframeDataset(self.rows, self.columns, 'ts', '1m', 'ms')
+
+    def test_roundtrip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for fmt in ('csv', 'parquet', 'arrow'):
+                path = os.path.join(directory, 'test.' + fmt)
+                getattr(timeframedsio, 'write_' + fmt)(self.ds, path, batch_size=30)
+                read = getattr(timeframedsio, 'read_' + fmt)
+                if fmt == 'csv':
+                    with self.assertRaises(TimeframeDatasetError):
+                        read(path, None)  # CSV has no timeframe metadata
+                    ds = read(path, '1m', tsunit='ms', block_size=1024)
+                else:
+                    ds = read(path, batch_size=30) if fmt == 'parquet' else read(path)
+                self.assertEqual(ds, self.ds)
+                self.assertEqual((ds.tsname, ds.timeframe.timeframe, ds.tsunit), ('ts', '1m', 'ms'))
+
+                # Test columns selection, renaming and list-backed result
+                ds = read(path, '1m', columns=['ts', 'Close'], tsunit='ms', names={'ts': 'Time'}, columnar=False)
+                self.assertIsInstance(ds, TimeframeDataset)
+                self.assertEqual(ds.columns, ['Time', 'Close'])
+                self.assertEqual(ds.data[-1], [self.rows[-1][0], self.rows[-1][4]])
+
+            # Test list-backed dataset writing
+            path = os.path.join(directory, 'list.parquet')
+            timeframedsio.write_parquet(self.ds.to_dataset(), path)
+            self.assertEqual(timeframedsio.read_parquet(path, columnar=False).data, self.rows)
+
+    def test_read_csv(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'test.csv')
+            with open(path, 'w') as f:
+                f.write('Date;Open;Close\n2020-07-20T15:30:00;9187.6;9192.8\n2020-07-20T16:00:00;9192.8;9189.8\n')
+            ds = timeframedsio.read_csv(path, '30m', delimiter=';')
+            self.assertEqual(ds.tolist(), [[1595259000, 9187.6, 9192.8], [1595260800, 9192.8, 9189.8]])
+            with open(path, 'w') as f:
+                f.write('Date,Close\n2,1\n1,1\n')
+            with self.assertRaises(TimeframeDatasetError):
+                timeframedsio.read_csv(path, '1m')
+            with self.assertRaises(TimeframeDatasetError):
+                timeframedsio.read_csv(path, '1m', tsname='Timestamp')
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+import matplotlib
+import numpy as np
+import pandas as pd
+from timeframeds import TimeframeDataset, ColumnarTimeframeDataset
+from timeframedsplot import tfds2pdf, pdf2tfds, lttb, decimate, plot
+
+matplotlib.use('Agg')
+
+
+class TestTimeframedsplot(unittest.TestCase):
+
+    def setUp(self):
+        self.columns = ['ts', 'Open', 'High', 'Low', 'Close', 'Volume']
+        self.rows = [[1600000020 + i * 60, 10.0 + i, 12.0 + i, 9.0 + i, 11.0 + i, 1.0 * i] for i in range(100)]
+
+    def test_tfds2pdf(self):
+        for tsunit, factor in (('s', 1), ('ms', 1000)):
+            rows = [[row[0] * factor] + row[1:] for row in self.rows]
+            for ds in (TimeframeDataset(rows, self.columns, 'ts', '1m', tsunit),
+                       ColumnarTimeframeDataset(rows, self.columns, 'ts', '1m', tsunit)):
+                pdf = tfds2pdf(ds)
+                self.assertEqual(list(pdf.columns), self.columns[1:])
+                self.assertTrue(pd.api.types.is_datetime64_dtype(pdf.index))
+                self.assertIsNone(pdf.index.tz)
+                self.assertEqual(pdf.index.name, 'ts')
+                self.assertEqual(pdf.index[0], pd.Timestamp('2020-09-13 12:27:00'))
+                self.assertEqual(pdf.index.values.astype('datetime64[s]').astype(np.int64).tolist(),
+                                 [row[0] for row in self.rows])
+                self.assertEqual(pdf['Close'].tolist(), [row[4] for row in rows])
+
+                # Test round trip for both backends
+                for columnar in (False, True):
+                    converted = pdf2tfds(pdf, '1m', tsunit=tsunit, columnar=columnar)
+                    self.assertIsInstance(converted, ColumnarTimeframeDataset if columnar else TimeframeDataset)
+                    self.assertEqual((converted.columns, converted.tsname, converted.tsunit),
+                                     (self.columns, 'ts', tsunit))
+                    self.assertEqual(list(converted), rows)
+
+        # Test columns of the columnar dataset are not copied
+        ds = ColumnarTimeframeDataset(self.rows, self.columns, 'ts', '1m')
+        pdf = tfds2pdf(ds)
+        for column in self.columns[1:]:
+            self.assertTrue(np.shares_memory(pdf[column].to_numpy(), ds.column(column)))
+
+        # Test dataframe with unnamed index and other timestamp unit
+        pdf.index.name = None
+        converted = pdf2tfds(pdf, '1m', tsunit='ms')
+        self.assertEqual(converted.tsname, 'Timestamp')
+        self.assertEqual(converted.data[0][0], self.rows[0][0] * 1000)
+
+    def test_lttb(self):
+        x = np.arange(1000)
+        y = np.sin(x / 50) + x / 500
+        indexes = lttb(x, y, 50)
+        self.assertEqual(len(indexes), 50)
+        self.assertEqual((indexes[0], indexes[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(indexes) > 0))
+        self.assertEqual(lttb(x[:10], y[:10], 20).tolist(), list(range(10)))
+
+    def test_decimate(self):
+        prices = np.round(100 + np.cumsum(np.sin(np.arange(4000) * 0.7)), 1).reshape(-1, 4)
+        rows = [[1600000020 + i * 60, p[0], max(p), min(p), p[3], float(i % 7)] for i, p in enumerate(prices.tolist())]
+        ds = ColumnarTimeframeDataset(rows, self.columns, 'ts', '1m')
+        self.assertIs(decimate(ds, 1000), ds)
+
+        # Test the smallest coarser timeframe fitting the bars number is chosen: 1000 minutes are 68 15m bars
+        decimated = decimate(TimeframeDataset(rows, self.columns, 'ts', '1m'), 100)
+        self.assertEqual((decimated.timeframe.timeframe, len(decimated)), ('15m', 68))
+        self.assertEqual(decimate(ds, 250).timeframe.timeframe, '5m')
+        self.assertEqual(decimate(ds, 200).timeframe.timeframe, '15m')  # 201 5m bars do not fit
+
+        # Test OHLCV values are aggregated properly
+        rows = [row for row in rows if row[0] < decimated.get_timestamp(2)][-15:]
+        self.assertEqual(decimated.tolist()[1], [decimated.get_timestamp(1), rows[0][1], max(r[2] for r in rows),
+                                                 min(r[3] for r in rows), rows[-1][4], sum(r[5] for r in rows)])
+
+        # Test bars are downsampled with lttb() if even monthly bars do not fit
+        rows = [[1600041600 + i * 86400, 10.0 + i, 12.0 + i, 9.0 + i, 11.0 + i, 1.0] for i in range(400)]
+        decimated = decimate(ColumnarTimeframeDataset(rows, self.columns, 'ts', '1D'), 5)
+        self.assertEqual((decimated.timeframe.timeframe, len(decimated)), ('1M', 5))
+        monthly = ColumnarTimeframeDataset(rows, self.columns, 'ts', '1D').resample('1M')
+        self.assertEqual(decimated.tolist()[0], monthly.tolist()[0])
+        self.assertEqual(decimated.tolist()[-1], monthly.tolist()[-1])
+
+    def test_plot(self):
+        rows = [[1600000020 + i * 60, 10.0 + i, 12.0 + i, 9.0 + i, 11.0 + i, 1.0 * i] for i in range(1000)]
+        ds = ColumnarTimeframeDataset(rows, self.columns, 'ts', '1m')
+        bars = int(1.5 * matplotlib.rcParams['figure.dpi'] / 3)
+        fig, axes = plot(ds, type='line', figsize=(1.5, 2), returnfig=True)
+        self.assertEqual(len(axes[0].lines[0].get_xdata()), bars)
+        fig, axes = plot(ds, figsize=(1.5, 2), returnfig=True)
+        self.assertEqual(len(axes[0].collections[-1].get_paths()), len(decimate(ds, bars)))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'plot.png')
+            plot(TimeframeDataset(rows, self.columns, 'ts', '1m'), figsize=(1.5, 2), savefig=path)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(4), b'\x89PNG')
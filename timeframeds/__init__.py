@@ -1,2 +1,13 @@
 from .timeframe import *
 from .timeframe_dataset import *
+from .columnar_timeframe_dataset import *
+from .timeframe_pyramid import *
+from .tick_aggregator import *
+from .ring_timeframe_dataset import *
+from .indicators import *
+from .timeframe_dataset_file import *
+from .shared_timeframe_dataset import *
+from .timeframe_panel import *
+from .backfill import *
+from .backtest import *
+from .timeframe_archive import *
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Backfill planning: turn missing bars ranges of the dataset (see TimeframeDataset.gaps()) into the minimal list of
+paged fetch requests"""
+from timeframeds import Timeframe, TimeframeDatasetError
+
+
+def plan_backfill(gaps: list, timeframe: str, page_size: int, budget=None, newest_first=False) -> list:
+    """Return list of fetch requests {'start': start, 'end': end, 'limit': bars} (start <= bar start < end, in
+    seconds) covering all bars of the given missing bars ranges gaps (list of (start, end) tuples, see
+    TimeframeDataset.gaps()) with pages of no more then page_size bars. Requests are planned greedily: every page
+    starts at the first not yet covered missing bar and spans the next gaps if they fit into the page, which gives
+    the minimal number of requests. Requests end at the last missing bar they cover, so present bars at the pages ends
+    are not fetched. If budget (maximum number of requests, e.g. the rate limit for the backfill run) is given, only the
+    first budget requests are returned (the newest ones if newest_first is True), the rest can be planned after they
+    are fetched. Newest first requests are planned backwards from the newest missing bar"""
+    if page_size < 1:
+        raise TimeframeDatasetError("Backfill page size must be positive!")
+    timeframe = Timeframe(timeframe)
+    gaps = sorted(gaps)
+    requests = []
+    if not newest_first:
+        cursor, g = None, 0
+        while g < len(gaps):
+            cursor = gaps[g][0] if cursor is None or cursor < gaps[g][0] else cursor
+            page_end = int(timeframe.shift(cursor, page_size))
+            request_end = cursor
+            while g < len(gaps) and gaps[g][0] < page_end:
+                request_end = min(gaps[g][1], page_end)
+                if gaps[g][1] > page_end:
+                    break
+                g += 1
+            requests.append({'start': cursor, 'end': request_end, 'limit': int(timeframe.count(cursor, request_end))})
+            cursor = page_end
+    else:
+        # Mirrored planning: pages are planned backwards from the newest missing bar
+        cursor, g = None, len(gaps) - 1
+        while g >= 0:
+            cursor = gaps[g][1] if cursor is None or cursor > gaps[g][1] else cursor
+            page_start = int(timeframe.shift(cursor, -page_size))
+            request_start = cursor
+            while g >= 0 and gaps[g][1] > page_start:
+                request_start = max(gaps[g][0], page_start)
+                if gaps[g][0] < page_start:
+                    break
+                g -= 1
+            requests.append({'start': request_start, 'end': cursor,
+                             'limit': int(timeframe.count(request_start, cursor))})
+            cursor = page_start
+    return requests[:budget] if budget is not None else requests
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""This module contain class Backtest simulating trading strategies over the history data"""
+import numpy as np
+from timeframeds import TimeframeDataset, TimeframeDatasetError, ColumnarTimeframeDataset
+
+
+class Backtest:
+    """Backtesting engine over TimeframeDataset or ColumnarTimeframeDataset. Position is the fraction of equity
+    invested (1 - all in long, -1 - all in short, 0 - flat), target position decided at the bar close is filled at
+    the same bar close price, so the bar return is earned with the previous bar position. Every position change
+    costs (fee + slippage) * |position change| of equity. Equity compounds bar by bar.
+    Signal-based strategies are simulated fully vectorized with run_signals(), stateful ones with run() calling the
+    strategy function for every bar. Both return the same result dictionary with position, equity, returns and fees
+    arrays aligned with the dataset bars and stats dictionary. Usage:
+        bt = Backtest(ds, fee=0.001)
+        fast, slow = SMA(10).compute(ds)['SMA10'], SMA(50).compute(ds)['SMA50']
+        result = bt.run_signals(np.where(fast > slow, 1.0, 0.0))
+        result['stats']['total_return']
+    """
+
+    @property
+    def dataset(self) -> ColumnarTimeframeDataset:
+        return self.__dataset
+
+    @property
+    def prices(self) -> np.ndarray:
+        """Fill prices array"""
+        return self.__prices
+
+    def __init__(self, ds, fee=0.0, slippage=0.0, price='close', initial=1.0):
+        """ds: dataset to backtest on; fee and slippage: fractions of the traded value; price: fill prices column
+        (case insensitive); initial: initial equity"""
+        if isinstance(ds, TimeframeDataset):
+            ds = ColumnarTimeframeDataset.from_dataset(ds)
+        columns = [column for column in ds.columns if column.lower() == price.lower()]
+        if not columns:
+            raise TimeframeDatasetError("Dataset has no {} column!".format(price))
+        self.__dataset = ds
+        self.__prices = ds.column(columns[0])
+        self.__returns = np.zeros(len(ds))
+        self.__returns[1:] = self.__prices[1:] / self.__prices[:-1] - 1
+        self.cost = fee + slippage
+        self.initial = initial
+
+    def run_signals(self, positions) -> dict:
+        """Simulate strategy given as the array of target positions for every bar (NaN - keep the previous position),
+        vectorized"""
+        positions = np.asarray(positions, dtype=np.float64)
+        if positions.shape != self.__prices.shape:
+            raise TimeframeDatasetError("Positions array must have {} items!".format(len(self.__prices)))
+        # Forward fill NaN positions (keep the previous position, 0 before the first signal)
+        indexes = np.where(np.isnan(positions), -1, np.arange(len(positions)))
+        np.maximum.accumulate(indexes, out=indexes)
+        positions = np.where(indexes >= 0, positions[np.maximum(indexes, 0)], 0.0)
+        held = np.zeros(len(positions))
+        held[1:] = positions[:-1]
+        costs = self.cost * np.abs(positions - held)
+        growth = 1 + held * self.__returns
+        equity = self.initial * np.cumprod(growth * (1 - costs))
+        fees = np.concatenate(([self.initial], equity[:-1])) * growth * costs
+        return self.result(positions, equity, fees)
+
+    def run(self, strategy) -> dict:
+        """Simulate stateful strategy: strategy(index, position, equity) function is called at every bar close with
+        the current position and equity and returns the target position (or None to keep the current one). Strategy
+        gets and returns only plain numbers, so it can be compiled (e.g. with numba) if needed"""
+        cost, length = self.cost, len(self.__returns)
+        positions, equity, fees = [0.0] * length, [0.0] * length, [0.0] * length
+        position, value = 0.0, self.initial
+        for index, change in enumerate(self.__returns.tolist()):  # Python floats are faster in the loop
+            value *= 1 + position * change
+            target = strategy(index, position, value)
+            if target is not None and target != position:
+                fees[index] = value * cost * abs(target - position)
+                value -= fees[index]
+                position = target
+            positions[index], equity[index] = position, value
+        positions, equity, fees = np.array(positions, dtype=np.float64), np.array(equity), np.array(fees)
+        return self.result(positions, equity, fees)
+
+    def result(self, positions: np.ndarray, equity: np.ndarray, fees: np.ndarray) -> dict:
+        """Return result dictionary for the given positions, equity and fees arrays"""
+        returns = np.diff(equity, prepend=self.initial) / np.concatenate(([self.initial], equity[:-1]))
+        return {'position': positions, 'equity': equity, 'returns': returns, 'fees': fees,
+                'stats': self.stats(positions, equity, returns, fees)}
+
+    def stats(self, positions: np.ndarray, equity: np.ndarray, returns: np.ndarray, fees: np.ndarray) -> dict:
+        """Return dictionary with the backtest statistics: total return, maximum drawdown, annualized Sharpe ratio,
+        number of trades (position changes), exposure (fraction of bars with open position) and total fees"""
+        if not len(equity):
+            return {'total_return': 0.0, 'max_drawdown': 0.0, 'sharpe': 0.0, 'trades': 0, 'exposure': 0.0,
+                    'fees': 0.0}
+        peaks = np.maximum.accumulate(np.concatenate(([self.initial], equity)))[1:]
+        std = returns.std()
+        bars_per_year = 365 * 86400 / self.dataset.timeframe.duration
+        return {'total_return': float(equity[-1] / self.initial - 1),
+                'max_drawdown': float(np.max(1 - equity / peaks)),
+                'sharpe': float(returns.mean() / std * bars_per_year ** 0.5) if std > 0 else 0.0,
+                'trades': int(np.count_nonzero(np.diff(positions, prepend=0.0))),
+                'exposure': float(np.count_nonzero(positions) / len(positions)), 'fees': float(fees.sum())}
@@ -0,0 +1,508 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""This module contain class ColumnarTimeframeDataset representing history data stored column by column"""
+import time
+from operator import itemgetter
+import numpy as np
+from timeframeds import Timeframe, TimeframeDataset, TimeframeDatasetError
+from timefuncs import gmtdt
+
+
+class ColumnarTimeframeDataset:
+    """Columnar (NumPy-backed) alternative to TimeframeDataset. Every column is stored in its own contiguous typed
+    array: int64 for the timestamp column and float64 for the others. Row-oriented API (indexing, slicing, get_dict(),
+    get_timestamp(), is_inside(), summary(), etc.) is the same as in TimeframeDataset, and whole columns are available
+    via column() for the vectorized calculations"""
+
+    tsdtype = np.int64
+    """Data type of the timestamp column"""
+
+    dtype = np.float64
+    """Data type of all other columns"""
+
+    partial = False
+    """True if the last bar is partial: it was aggregated (see resample()) not from all of its base bars"""
+
+    _buffers = None
+    """Own column buffers with spare capacity for append(), allocated on the first append() or amend()"""
+
+    _indicators = ()
+    """Attached indicators, see add_indicator()"""
+
+    @property
+    def columns(self):
+        return self.__columns
+
+    @columns.setter
+    def columns(self, columns):
+        self.__columns = columns
+
+    @property
+    def tsname(self):
+        return self.__tsname
+
+    @tsname.setter
+    def tsname(self, tsname):
+        self.__tsname = tsname
+        self.__tsindex = self.columns.index(tsname)
+
+    @property
+    def tsindex(self):
+        return self.__tsindex
+
+    @property
+    def tscoef(self):
+        return self.__tscoef
+
+    @property
+    def tsunit(self):
+        return self.__tsunit
+
+    @tsunit.setter
+    def tsunit(self, tsunit):
+        self.__tsunit = tsunit
+        self.__tscoef = TimeframeDataset.timestamp_coefficient(tsunit)
+
+    @property
+    def timeframe(self):
+        return self.__timeframe
+
+    @timeframe.setter
+    def timeframe(self, timeframe):
+        self.__timeframe = timeframe
+
+    @property
+    def nbytes(self) -> int:
+        """Memory (in bytes) taken by the dataset columns"""
+        return sum(self._arrays[column].nbytes for column in self.columns)
+
+    def __init__(self, data, columns: list, tsname: str, timeframe: str, tsunit='s'):
+        """data: list of lists or tuples, or dictionary {column name: array-like column values};
+        column_names: list of strings with column names"""
+        self.columns = columns
+        self.tsname = tsname
+        self.timeframe = Timeframe(timeframe)
+        self.tsunit = tsunit
+        self._arrays = self.to_arrays(data, columns, tsname)
+        report = self.validate()
+        if not report['ok']:
+            raise TimeframeDatasetError("Given data is not ok! First wrong item index: {}, reason: {}".format(
+                report['first_bad_index'], report['reason']))
+
+    @classmethod
+    def to_arrays(cls, data, columns: list, tsname: str) -> dict:
+        """Convert given data (list of lists or tuples, or dictionary of column values) into dictionary of NumPy arrays.
+        Given NumPy arrays of proper data type are used as is, without copying"""
+        if isinstance(data, dict):
+            missing = [column for column in columns if column not in data]
+            if missing:
+                raise TimeframeDatasetError("Given data has no {} columns!".format(missing))
+            values = [data[column] for column in columns]
+        else:
+            rows = data if isinstance(data, (list, tuple)) else list(data)
+            if not set(map(type, rows)) <= {list, tuple} or set(map(len, rows)) - {len(columns)}:
+                index = next(index for index, row in enumerate(rows)
+                             if not isinstance(row, (list, tuple)) or len(row) != len(columns))
+                raise TimeframeDatasetError("Given data rows must be lists (tuples) of {} items! Wrong item index: {}"
+                                            .format(len(columns), index))
+            return {column: np.fromiter(map(itemgetter(idx), rows), count=len(rows),
+                                        dtype=cls.tsdtype if column == tsname else cls.dtype)
+                    for idx, column in enumerate(columns)}
+        arrays = {}
+        for column, value in zip(columns, values):
+            arrays[column] = np.ascontiguousarray(value, dtype=cls.tsdtype if column == tsname else cls.dtype)
+        if any(array.ndim != 1 for array in arrays.values()) or len({len(array) for array in arrays.values()}) > 1:
+            raise TimeframeDatasetError("Given data columns must be one-dimensional and have the same length!")
+        return arrays
+
+    @classmethod
+    def from_dataset(cls, tfds: TimeframeDataset):
+        """Create ColumnarTimeframeDataset from given TimeframeDataset tfds"""
+        return cls(tfds.data, columns=tfds.columns, tsname=tfds.tsname, timeframe=tfds.timeframe.timeframe,
+                   tsunit=tfds.tsunit)
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, columns: list, tsname: str, timeframe: str, tsunit='s'):
+        """Create dataset over given dictionary of column arrays (memory-mapped, shared memory, etc.) as is, without
+        copying and validation, O(1). Arrays must be one-dimensional, of the same length and of tsdtype (timestamp
+        column) and dtype (other columns) data types. Arrays may be read-only, then the dataset can be changed only
+        after copy()"""
+        if any(arrays[column].dtype != (cls.tsdtype if column == tsname else cls.dtype) for column in columns):
+            raise TimeframeDatasetError("Given arrays must be of {} and {} data types!".format(
+                np.dtype(cls.tsdtype), np.dtype(cls.dtype)))
+        ds = cls.__new__(cls)
+        ds.columns = columns
+        ds.tsname = tsname
+        ds.timeframe = Timeframe(timeframe)
+        ds.tsunit = tsunit
+        ds._arrays = {column: arrays[column] for column in columns}
+        return ds
+
+    def to_dataset(self) -> TimeframeDataset:
+        """Convert to the list-based TimeframeDataset. This function is reverse to from_dataset()"""
+        return TimeframeDataset(self.tolist(), columns=self.columns, tsname=self.tsname,
+                                timeframe=self.timeframe.timeframe, tsunit=self.tsunit)
+
+    def __len__(self):
+        return len(self._arrays[self.tsname])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice) and (i.step or 1) > 0:
+            # Slice is a view: it shares columns storage with this dataset and skips revalidation
+            ds = self._derive({column: self._arrays[column][i] for column in self.columns})
+            ds.partial = self.partial and i.indices(len(self))[1] >= len(self) > 0 and len(ds) > 0
+            return ds
+        elif isinstance(i, slice):
+            return ColumnarTimeframeDataset({column: self._arrays[column][i] for column in self.columns},
+                                            columns=self.columns, tsname=self.tsname,
+                                            timeframe=self.timeframe.timeframe, tsunit=self.tsunit)
+        else:
+            return [self._arrays[column][i].item() for column in self.columns]
+
+    def _derive(self, arrays: dict):
+        """Return new dataset with the same columns, timestamp and timeframe settings for the given column arrays,
+        that are already known to be valid. Validation and timeframe parsing are skipped"""
+        ds = ColumnarTimeframeDataset.__new__(ColumnarTimeframeDataset)
+        ds.columns = self.columns
+        ds.tsname = self.tsname
+        ds.timeframe = self.timeframe
+        ds.tsunit = self.tsunit
+        ds._arrays = arrays
+        return ds
+
+    def copy(self):
+        """Return copy of the dataset. Unlike slices (views), the copy does not share storage with this dataset"""
+        ds = self._derive({column: self._arrays[column].copy() for column in self.columns})
+        ds.partial = self.partial
+        return ds
+
+    def _reserve(self, length: int):
+        """Make sure dataset own column buffers can hold given number of rows, growing them geometrically"""
+        if self._buffers is None or len(self._buffers[self.tsname]) < length:
+            capacity = max(16, length, 2 * len(self))
+            buffers = {}
+            for column in self.columns:
+                buffers[column] = np.empty(capacity, dtype=self._arrays[column].dtype)
+                buffers[column][:len(self)] = self._arrays[column]
+            self._buffers = buffers
+            self._arrays = {column: self._buffers[column][:len(self)] for column in self.columns}
+
+    def append(self, row):
+        """Append given row (list or tuple of columns values) to the end of the dataset, amortized O(1). Row timestamp
+        must be bigger then the last one. Slices (views) taken before are not changed"""
+        length = len(self)
+        if len(row) != len(self.columns):
+            raise TimeframeDatasetError("Given row must have {} items!".format(len(self.columns)))
+        if row[self.tsindex] < 0 or length and row[self.tsindex] <= self._arrays[self.tsname][-1]:
+            raise TimeframeDatasetError("Given row timestamp must be positive and bigger then the last one!")
+        self._reserve(length + 1)
+        for idx, column in enumerate(self.columns):
+            self._buffers[column][length] = row[idx]
+        self._arrays = {column: self._buffers[column][:length + 1] for column in self.columns}
+        self._updated(1)
+
+    def extend(self, data):
+        """Append given data (list of lists or tuples, or dictionary of column values, see to_arrays()) to the end of
+        the dataset, amortized O(len(data)). Data timestamps must be bigger then the last one"""
+        arrays = self.to_arrays(data, self.columns, self.tsname)
+        length, count = len(self), len(arrays[self.tsname])
+        if not count:
+            return
+        report = TimeframeDataset.validate_timestamps(arrays[self.tsname])
+        if not report['ok'] or length and arrays[self.tsname][0] <= self._arrays[self.tsname][-1]:
+            raise TimeframeDatasetError("Given data timestamps must be positive, sorted and bigger then the last one!")
+        self._reserve(length + count)
+        for column in self.columns:
+            self._buffers[column][length:length + count] = arrays[column]
+        self._arrays = {column: self._buffers[column][:length + count] for column in self.columns}
+        self._updated(count)
+
+    def amend(self, row):
+        """Replace the last row with the given one (e.g. update the still open last bar), O(1). Row timestamp must be
+        equal to the last one"""
+        if len(row) != len(self.columns):
+            raise TimeframeDatasetError("Given row must have {} items!".format(len(self.columns)))
+        if not len(self) or row[self.tsindex] != self._arrays[self.tsname][-1]:
+            raise TimeframeDatasetError("Given row timestamp must be equal to the last one!")
+        self._reserve(len(self))
+        for idx, column in enumerate(self.columns):
+            self._arrays[column][-1] = row[idx]
+        self._updated(1, amend=True)
+
+    def _assign(self, indexes: np.ndarray, arrays: dict):
+        """Replace rows with given indexes with the given column arrays values in place"""
+        self._reserve(len(self))
+        for column in self.columns:
+            self._arrays[column][indexes] = arrays[column]
+
+    def _replace(self, arrays: dict):
+        """Replace all dataset rows with the given (already validated) column arrays and recompute indicators"""
+        self._arrays, self._buffers = arrays, None
+        for indicator in self._indicators:
+            indicator.attach(self)
+
+    def merge(self, other, policy='replace') -> dict:
+        """Merge given other dataset (ColumnarTimeframeDataset, TimeframeDataset or data accepted by the constructor
+        with the same columns and timestamp units) into this one in place, vectorized. Rows with equal timestamps are
+        resolved according to the given policy, see TimeframeDataset.merge(). Return report dictionary with numbers of
+        inserted and updated rows. The common case of the updated last bar plus new bars is handled as amend() plus
+        extend(), other cases rebuild the columns without revalidation"""
+        if policy not in TimeframeDataset.merge_policies():
+            raise TimeframeDatasetError("Merge policy must be one of {}!".format(TimeframeDataset.merge_policies()))
+        if isinstance(other, TimeframeDataset):
+            other = ColumnarTimeframeDataset.from_dataset(other)
+        elif not isinstance(other, ColumnarTimeframeDataset):
+            other = ColumnarTimeframeDataset(other, self.columns, self.tsname, self.timeframe.timeframe, self.tsunit)
+        if other.columns != self.columns or other.tsname != self.tsname or other.tsunit != self.tsunit or \
+                other.timeframe.timeframe != self.timeframe.timeframe:
+            raise TimeframeDatasetError("Merged datasets must have the same columns, tsname, timeframe and tsunit!")
+        ts, other_ts = self._arrays[self.tsname], other.column(self.tsname)
+        positions = np.searchsorted(ts, other_ts)
+        matched = positions < len(ts)
+        matched[matched] = ts[positions[matched]] == other_ts[matched]
+        changed = np.zeros(len(other_ts), dtype=bool)
+        for column in self.columns:
+            old, new = self._arrays[column][positions[matched]], other.column(column)[matched]
+            differ = old != new
+            if old.dtype.kind == 'f':
+                differ &= ~(np.isnan(old) & np.isnan(new))
+            changed[matched] |= differ
+        if policy == 'error' and changed.any():
+            raise TimeframeDatasetError("Merged datasets have different rows with timestamp {}!".format(
+                other_ts[np.argmax(changed)]))
+        updated = np.flatnonzero(changed) if policy == 'replace' else np.empty(0, dtype=np.int64)
+        inserted = np.flatnonzero(~matched)
+        report = {'inserted': len(inserted), 'updated': len(updated)}
+        length = len(self)
+        last = len(other_ts) and (not length or other_ts[-1] > ts[-1] or other_ts[-1] == ts[-1] and policy == 'replace')
+        if len(inserted) and length and other_ts[inserted[0]] < ts[-1]:
+            # New rows are inside the dataset, so columns are rebuilt
+            indexes = np.arange(length) + np.searchsorted(other_ts[inserted], ts)
+            other_indexes = positions[inserted] + np.arange(len(inserted))
+            arrays = {}
+            for column in self.columns:
+                arrays[column] = np.empty(length + len(inserted), dtype=self._arrays[column].dtype)
+                arrays[column][indexes] = self._arrays[column]
+                arrays[column][indexes[positions[updated]]] = other.column(column)[updated]
+                arrays[column][other_indexes] = other.column(column)[inserted]
+            self._replace(arrays)
+        else:
+            if len(updated):
+                self._assign(positions[updated], {column: other.column(column)[updated] for column in self.columns})
+                if positions[updated[0]] == length - 1:
+                    self._updated(1, amend=True)
+                else:
+                    for indicator in self._indicators:
+                        indicator.attach(self)
+            if len(inserted):
+                self.extend({column: other.column(column)[inserted] for column in self.columns})
+        if last:
+            self.partial = other.partial  # last row is taken from the other dataset
+        return report
+
+    def add_indicator(self, indicator):
+        """Attach given indicator (see timeframeds.indicators) to the dataset. Indicator columns are computed for the
+        whole dataset vectorized, and then updated in O(1) on every append() and amend(). Indicator columns are
+        available via column() and get_dict(). Slices and copies of the dataset have no indicators"""
+        indicator.attach(self)
+        self._indicators = self._indicators + (indicator,)
+
+    @property
+    def indicators(self) -> list:
+        """List of attached indicators"""
+        return list(self._indicators)
+
+    def _updated(self, count: int, amend=False):
+        """Update attached indicators for the given number of the last bars, which were appended (or amended)"""
+        for indicator in self._indicators:
+            if amend:
+                indicator.update(self, len(self) - 1, amend=True)
+            elif count >= len(self) - count:
+                indicator.attach(self)  # a lot of new bars, vectorized computation is faster
+            else:
+                for index in range(len(self) - count, len(self)):
+                    indicator.update(self, index)
+
+    def __iter__(self):
+        for row in zip(*(self._arrays[column].tolist() for column in self.columns)):
+            yield list(row)
+
+    def __eq__(self, other):
+        if isinstance(other, ColumnarTimeframeDataset):
+            return self.columns == other.columns and len(self) == len(other) and \
+                   all(np.array_equal(self.column(column), other.column(column)) for column in self.columns)
+        return self.tolist() == list(other)
+
+    def __repr__(self):
+        return '{}(length={}, columns={}, tsname={!r}, timeframe={!r}, tsunit={!r})'.format(
+            self.__class__.__name__, len(self), self.columns, self.tsname, self.timeframe.timeframe, self.tsunit)
+
+    def column(self, name: str) -> np.ndarray:
+        """Return NumPy array with the values of the given column (or attached indicator column)"""
+        if name in self._arrays:
+            return self._arrays[name]
+        for indicator in self._indicators:
+            if name in indicator.names:
+                return indicator.values(name)
+        raise TimeframeDatasetError("Dataset has no {} column!".format(name))
+
+    def tolist(self) -> list:
+        """Return dataset data as list of lists (rows), the same as TimeframeDataset.data"""
+        return list(self)
+
+    def get_dict(self, index=-1, timestamp_format=None) -> dict:
+        """Return dictionary with data from given index. Timestamp formatted according given timestamp_format"""
+        d = dict(zip(self.columns, self[index]))
+        for indicator in self._indicators:
+            d.update({name: indicator.values(name)[index].item() for name in indicator.names})
+        if timestamp_format == 'timestamp':
+            d[self.tsname] = int(d[self.tsname] * self.tscoef)
+        elif timestamp_format == 'human':
+            d[self.tsname] = self.timeframe.fmt(d[self.tsname] * self.tscoef)
+        elif timestamp_format == 'iso':
+            d[self.tsname] = self.timeframe.fmt(d[self.tsname] * self.tscoef, fmt='iso')
+        return d
+
+    def dict2list(self, d):
+        """Return correct list that can be used as dataset row. This function is reverse to self.get_dict()"""
+        lst = []
+        for column in self.columns:
+            if column in d:
+                lst.append(d[column])
+            else:
+                raise TimeframeDatasetError("Given dictionary has no {} key!".format(column))
+        return lst
+
+    def get_timestamp(self, index=-1) -> int:
+        """Return start timestamp from given index"""
+        return int(self._arrays[self.tsname][index].item() * self.tscoef)
+
+    def is_ok(self):
+        """Check dataset data is ok: timestamps are positive and sorted ascending without duplicates"""
+        return self.validate()['ok']
+
+    def validate(self, continuous=False) -> dict:
+        """Return validation report for the dataset timestamps (see TimeframeDataset.validate_timestamps()). If
+        continuous is True, also check timestamps are stepped by timeframe duration and report gaps"""
+        duration = round(self.timeframe.duration / self.tscoef) if continuous else 0
+        return TimeframeDataset.validate_timestamps(self._arrays[self.tsname], duration)
+
+    def is_inside(self, timestamp=None, index=-1):
+        """Chek given timestamp (current time by default) is inside given index"""
+        timestamp = time.time() if timestamp is None else timestamp
+        start = self._arrays[self.tsname][index].item() * self.tscoef
+        return start <= timestamp < start + self.timeframe.duration
+
+    def _to_tsunit(self, timestamp):
+        """Convert given timestamp (in seconds) into the dataset timestamp units"""
+        return timestamp * round(1 / self.tscoef)
+
+    def locate(self, timestamp):
+        """Return index of the bar containing given timestamp (in seconds), or None if there is no such bar. Timestamp
+        may be an array of timestamps, then array of indexes is returned with -1 for timestamps without bar"""
+        index = self.asof(timestamp)
+        if np.ndim(timestamp):
+            ts = self._arrays[self.tsname]
+            start = ts[index] if len(ts) else np.zeros_like(index)
+            inside = self._to_tsunit(np.asarray(timestamp)) < start + self._to_tsunit(self.timeframe.duration)
+            return np.where((index >= 0) & inside, index, -1)
+        return index if index is not None and self.is_inside(timestamp, index) else None
+
+    def asof(self, timestamp):
+        """Return index of the last bar started at or before given timestamp (in seconds), or None if there is no
+        such bar. Timestamp may be an array of timestamps, then array of indexes is returned with -1 for timestamps
+        before the first bar"""
+        index = np.searchsorted(self._arrays[self.tsname], self._to_tsunit(np.asarray(timestamp)), side='right') - 1
+        if np.ndim(timestamp):
+            return index
+        return int(index) if index >= 0 else None
+
+    def between(self, start, end):
+        """Return slice (view) of the dataset with bars started at start <= timestamp < end (in seconds)"""
+        ts = self._arrays[self.tsname]
+        return self[np.searchsorted(ts, self._to_tsunit(start)):np.searchsorted(ts, self._to_tsunit(end))]
+
+    def aggregations(self, how=None) -> dict:
+        """Return dictionary {column name: aggregation} used to aggregate bars into the coarser timeframe bars (see
+        resample()), with the given how dictionary overrides"""
+        aggregations = {'open': 'first', 'high': 'max', 'low': 'min', 'volume': 'sum'}
+        aggregations = {column: aggregations.get(column.lower(), 'last') for column in self.columns}
+        aggregations.update(how or {})
+        return aggregations
+
+    def resample(self, timeframe: str, how=None, partial=True):
+        """Aggregate dataset bars into the bars of the given coarser timeframe, vectorized. Bars are bucketed the same
+        way as Timeframe.starts() does. Columns are aggregated according to their names (case insensitive): open -
+        first value, high - maximum, low - minimum, volume - sum, all others - last value. Aggregation can be
+        overridden with how dictionary {column name: 'first', 'last', 'max', 'min' or 'sum'}. If the trailing bucket
+        is not complete, resulting dataset is marked as partial, or that bucket is dropped if partial is False"""
+        target = Timeframe(timeframe)
+        if target.duration <= self.timeframe.duration:
+            raise TimeframeDatasetError("Can not resample {} dataset to the not coarser {} timeframe!".format(
+                self.timeframe.timeframe, timeframe))
+        aggregations = self.aggregations(how)
+        factor = round(1 / self.tscoef)
+        ts = self._arrays[self.tsname]
+        starts = target.starts(ts // factor)
+        first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]]) if len(ts) else np.empty(0, dtype=np.int64)
+        last = np.r_[first[1:] - 1, len(ts) - 1] if len(ts) else first
+        reducers = {'max': np.maximum, 'min': np.minimum, 'sum': np.add}
+        arrays = {}
+        for column in self.columns:
+            if column == self.tsname:
+                arrays[column] = starts[first] * factor
+            elif aggregations[column] == 'first':
+                arrays[column] = self._arrays[column][first]
+            elif aggregations[column] == 'last':
+                arrays[column] = self._arrays[column][last]
+            elif aggregations[column] in reducers:
+                arrays[column] = reducers[aggregations[column]].reduceat(self._arrays[column], first) if len(ts) \
+                    else self._arrays[column][first]
+            else:
+                raise TimeframeDatasetError("Unknown aggregation {} for {} column!".format(aggregations[column],
+                                                                                         column))
+        ds = ColumnarTimeframeDataset(arrays, columns=self.columns, tsname=self.tsname, timeframe=timeframe,
+                                      tsunit=self.tsunit)
+        if len(ts):
+            base_end = self.timeframe.ends(self.timeframe.starts(ts[-1] // factor))
+            ds.partial = bool(base_end < target.ends(starts[-1]))
+            if ds.partial and not partial:
+                ds = ds[:-1]
+        return ds
+
+    def is_last_closed(self):
+        """Check last bar is closed (current timestamp is equal or bigger then closing timestamp)"""
+        return time.time() >= self.get_timestamp() + self.timeframe.duration
+
+    def is_continuous(self):
+        """Check dataset is continuous (has now holes in data, has points for all timestamps)"""
+        return self.validate(continuous=True)['ok']
+
+    def gaps(self, start=None, end=None) -> list:
+        """Return list of (start, end) tuples of the missing bars ranges (in seconds), see
+        TimeframeDataset.find_gaps()"""
+        return TimeframeDataset.find_gaps(self._arrays[self.tsname] // round(1 / self.tscoef), self.timeframe, start,
+                                          end)
+
+    def summary(self):
+        """Return string with readable summary of ColumnarTimeframeDataset. Usage: print(ds.summary())"""
+        res = []
+        cts = time.time()
+        res.append('Summary for {}:'.format(self.__class__.__name__))
+        res.append('Current timestamp: {} (UTC {})'.format(cts, gmtdt(cts)))
+        res.append('Dataset length: {}'.format(len(self)))
+        res.append('Dataset memory usage, in bytes: {}'.format(self.nbytes))
+        res.append('Dataset is ok: {}'.format(self.is_ok()))
+        res.append('Dataset columns: {}'.format(self.columns))
+        res.append('Dataset timestamp column: {}'.format(self.tsname))
+        res.append('Dataset timestamp column index: {}'.format(self.tsindex))
+        res.append('First timestamp: {} (UTC {})'.format(self.get_timestamp(0), gmtdt(self.get_timestamp(0))))
+        res.append('First item: {}'.format(self[0]))
+        res.append('Last timestamp: {} (UTC {})'.format(self.get_timestamp(-1), gmtdt(self.get_timestamp(-1))))
+        res.append('Last item: {}'.format(self[-1]))
+        res.append('Timeframe: {}'.format(self.timeframe.timeframe))
+        res.append('Timeframe duration, in seconds: {}'.format(self.timeframe.duration))
+        res.append('Timestamp units: {}'.format(self.tsunit))
+        res.append('Timestamp coefficient: {}'.format(self.tscoef))
+        res.append('Last item is closed: {}'.format(self.is_last_closed()))
+        return '\n'.join(res)
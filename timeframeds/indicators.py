@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Technical indicators for ColumnarTimeframeDataset. Every indicator computes its columns for the whole dataset
+vectorized when attached to the dataset (see ColumnarTimeframeDataset.add_indicator()), and then updates them in O(1)
+for every appended or amended bar. Indicator values are NaN until indicator has enough bars (warm-up period)"""
+import numpy as np
+from timeframeds import TimeframeDatasetError
+
+
+def ewm(x: np.ndarray, alpha: float) -> np.ndarray:
+    """Return exponentially weighted moving average of x: y[0] = x[0], y[i] = y[i-1] + alpha * (x[i] - y[i-1]).
+    Vectorized: recursion is solved in closed form inside the chunks, that are small enough to keep weights finite"""
+    x = np.asarray(x, dtype=np.float64)
+    if alpha >= 1 or not len(x):
+        return x.copy()
+    decay = 1 - alpha
+    chunk = min(len(x), int(150 / -np.log10(decay)) + 1)
+    weights = decay ** -np.arange(chunk, dtype=np.float64)
+    y = np.empty_like(x)
+    carry = x[0]
+    for start in range(0, len(x), chunk):
+        values = x[start:start + chunk]
+        length = len(values)
+        y[start:start + length] = (decay * carry + alpha * np.cumsum(values * weights[:length])) / weights[:length]
+        carry = y[start + length - 1]
+    return y
+
+
+def rolling_sum(x: np.ndarray, period: int) -> np.ndarray:
+    """Return sums of the last period values of x for every index (NaN for the first period - 1 indexes)"""
+    x = np.asarray(x, dtype=np.float64)
+    res = np.full(len(x), np.nan)
+    if len(x) >= period:
+        cs = np.concatenate(([0.0], np.cumsum(x)))
+        res[period - 1:] = cs[period:] - cs[:-period]
+    return res
+
+
+class Indicator:
+    """Base class for the incremental indicators. Subclasses define compute() to calculate indicator columns for the
+    whole dataset, vectorized, state() to extract indicator state after the given bar and step() to calculate the next
+    bar values from the previous bar state in O(1). Indicator keeps states for the last two bars,
+    so the last bar can be amended"""
+
+    @property
+    def names(self) -> list:
+        """Names of the indicator columns"""
+        return self._names
+
+    def __init__(self, names: list):
+        self._names = names
+        self.__buffers = {name: np.empty(0) for name in names}
+        self.__count = 0
+        self.__length = 0
+        self.__states = (None, None)
+
+    @staticmethod
+    def resolve(ds, column: str) -> str:
+        """Return dataset column name matching given column name case insensitively"""
+        for name in ds.columns:
+            if name.lower() == column.lower():
+                return name
+        raise TimeframeDatasetError("Dataset has no {} column!".format(column))
+
+    def compute(self, ds) -> dict:
+        """Return dictionary {column name: values array} with the indicator values for the whole dataset ds"""
+        raise NotImplementedError
+
+    def state(self, ds, index: int):
+        """Return indicator state after the bar with given index (or initial state if index is negative). Called right
+        after compute(), so it can use values calculated there"""
+        raise NotImplementedError
+
+    def step(self, ds, index: int, state) -> tuple:
+        """Return tuple (state, values dictionary) for the dataset bar with given index based on previous bar state"""
+        raise NotImplementedError
+
+    def values(self, name: str) -> np.ndarray:
+        """Return array of indicator values with given name, aligned with the dataset rows"""
+        return self.__buffers[name][self.__count - self.__length:self.__count]
+
+    def attach(self, ds):
+        """Compute indicator columns for the whole dataset ds, vectorized, and initialize the state"""
+        columns = self.compute(ds)
+        self.__buffers = {name: np.concatenate((columns[name], np.empty(max(16, len(ds))))) for name in self.names}
+        self.__count = self.__length = len(ds)
+        self.__states = (self.state(ds, len(ds) - 2), self.state(ds, len(ds) - 1))
+
+    def update(self, ds, index: int, amend=False):
+        """Update indicator for the appended (or amended, if amend is True) dataset bar with given index, O(1)"""
+        previous = self.__states[0] if amend else self.__states[1]
+        state, values = self.step(ds, index, previous)
+        self.__states = (previous, state)
+        if not amend:
+            if self.__count == len(self.__buffers[self.names[0]]):
+                self._grow(len(ds))
+            self.__count += 1
+        for name in self.names:
+            self.__buffers[name][self.__count - 1] = values[name]
+        self.__length = len(ds)
+
+    def _grow(self, length: int):
+        """Make room for the next value: move the last length values to the buffers start (if dataset is bounded and
+        they take no more then half of the buffers), or allocate two times bigger buffers"""
+        capacity = len(self.__buffers[self.names[0]])
+        for name in self.names:
+            if length <= capacity // 2:
+                self.__buffers[name][:length] = self.__buffers[name][self.__count - length:self.__count]
+            else:
+                self.__buffers[name] = np.concatenate((self.__buffers[name], np.empty(capacity)))
+        if length <= capacity // 2:
+            self.__count = length
+
+
+class SMA(Indicator):
+    """Simple moving average of the given column over period bars"""
+
+    def __init__(self, period=20, column='close', name=None):
+        super().__init__([name or 'SMA{}'.format(period)])
+        self.period = period
+        self.column = column
+
+    def compute(self, ds) -> dict:
+        return {self.names[0]: rolling_sum(ds.column(self.resolve(ds, self.column)), self.period) / self.period}
+
+    def state(self, ds, index: int):
+        values = ds.column(self.resolve(ds, self.column))
+        return float(np.sum(values[max(0, index - self.period + 1):index + 1])) if index >= 0 else 0.0
+
+    def step(self, ds, index: int, state) -> tuple:
+        values = ds.column(self.resolve(ds, self.column))
+        state = state + values[index] - (values[index - self.period] if index >= self.period else 0.0)
+        return state, {self.names[0]: state / self.period if index >= self.period - 1 else np.nan}
+
+
+class EMA(Indicator):
+    """Exponential moving average of the given column over period bars (alpha = 2 / (period + 1)), seeded with the
+    first value"""
+
+    def __init__(self, period=20, column='close', name=None):
+        super().__init__([name or 'EMA{}'.format(period)])
+        self.period = period
+        self.column = column
+        self.alpha = 2 / (period + 1)
+
+    def compute(self, ds) -> dict:
+        values = ewm(ds.column(self.resolve(ds, self.column)), self.alpha)
+        self._raw = values.copy()
+        values[:self.period - 1] = np.nan
+        return {self.names[0]: values}
+
+    def state(self, ds, index: int):
+        return float(self._raw[index]) if index >= 0 else None
+
+    def step(self, ds, index: int, state) -> tuple:
+        value = ds.column(self.resolve(ds, self.column))[index]
+        state = value if state is None else state + self.alpha * (value - state)
+        return state, {self.names[0]: state if index >= self.period - 1 else np.nan}
+
+
+class ATR(Indicator):
+    """Average true range over period bars (Wilder's smoothing, alpha = 1 / period)"""
+
+    def __init__(self, period=14, name=None):
+        super().__init__([name or 'ATR{}'.format(period)])
+        self.period = period
+
+    def true_range(self, ds, index=None):
+        """Return true range array for the whole dataset, or true range value for the given index"""
+        high, low, close = (ds.column(self.resolve(ds, column)) for column in ('high', 'low', 'close'))
+        if index is None:
+            previous = np.concatenate((close[:1], close[:-1]))
+            return np.maximum(high - low, np.maximum(np.abs(high - previous), np.abs(low - previous)))
+        previous = close[index - 1] if index > 0 else close[index]
+        return max(high[index] - low[index], abs(high[index] - previous), abs(low[index] - previous))
+
+    def compute(self, ds) -> dict:
+        values = ewm(self.true_range(ds), 1 / self.period)
+        self._raw = values.copy()
+        values[:self.period - 1] = np.nan
+        return {self.names[0]: values}
+
+    def state(self, ds, index: int):
+        return float(self._raw[index]) if index >= 0 else None
+
+    def step(self, ds, index: int, state) -> tuple:
+        value = self.true_range(ds, index)
+        state = value if state is None else state + (value - state) / self.period
+        return state, {self.names[0]: state if index >= self.period - 1 else np.nan}
+
+
+class RSI(Indicator):
+    """Relative strength index of the given column over period bars (Wilder's smoothing of gains and losses)"""
+
+    def __init__(self, period=14, column='close', name=None):
+        super().__init__([name or 'RSI{}'.format(period)])
+        self.period = period
+        self.column = column
+
+    @staticmethod
+    def rsi(gain, loss):
+        """Return RSI value(s) for the given average gain(s) and loss(es)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+
+    def compute(self, ds) -> dict:
+        delta = np.diff(ds.column(self.resolve(ds, self.column)))
+        gain = np.concatenate(([np.nan], ewm(np.maximum(delta, 0), 1 / self.period)))
+        loss = np.concatenate(([np.nan], ewm(np.maximum(-delta, 0), 1 / self.period)))
+        self._raw = gain[:len(ds)], loss[:len(ds)]
+        values = self.rsi(gain, loss)[:len(ds)]
+        values[:self.period] = np.nan
+        return {self.names[0]: values}
+
+    def state(self, ds, index: int):
+        return (float(self._raw[0][index]), float(self._raw[1][index])) if index >= 1 else None
+
+    def step(self, ds, index: int, state) -> tuple:
+        if index < 1:
+            return None, {self.names[0]: np.nan}
+        values = ds.column(self.resolve(ds, self.column))
+        delta = values[index] - values[index - 1]
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        if state is not None:
+            gain, loss = state[0] + (gain - state[0]) / self.period, state[1] + (loss - state[1]) / self.period
+        return (gain, loss), {self.names[0]: float(self.rsi(gain, loss)) if index >= self.period else np.nan}
+
+
+class BollingerBands(Indicator):
+    """Bollinger bands of the given column: simple moving average over period bars (middle band) plus/minus k
+    standard deviations (upper and lower bands)"""
+
+    def __init__(self, period=20, k=2.0, column='close', name=None):
+        name = name or 'BB{}'.format(period)
+        super().__init__([name + '_middle', name + '_upper', name + '_lower'])
+        self.period = period
+        self.k = k
+        self.column = column
+
+    def _values(self, mean, std) -> dict:
+        return dict(zip(self.names, (mean, mean + self.k * std, mean - self.k * std)))
+
+    def compute(self, ds) -> dict:
+        values = ds.column(self.resolve(ds, self.column))
+        centered = values - (values.mean() if len(values) else 0.0)  # centered values keep variance precise
+        mean = rolling_sum(centered, self.period) / self.period
+        std = np.sqrt(np.maximum(rolling_sum(centered ** 2, self.period) / self.period - mean ** 2, 0.0))
+        return self._values(rolling_sum(values, self.period) / self.period, std)
+
+    def state(self, ds, index: int):
+        # State is (center, sum and sum of squares of the centered window values, steps since the state was computed
+        # from the window): centered sums keep variance precise, and they are recomputed every period steps, so
+        # rounding errors do not accumulate
+        window = ds.column(self.resolve(ds, self.column))[max(0, index - self.period + 1):index + 1]
+        if index < 0 or not len(window):
+            return 0.0, 0.0, 0.0, 0
+        center = float(np.mean(window))
+        centered = window - center
+        return center, float(np.sum(centered)), float(np.sum(centered ** 2)), 0
+
+    def step(self, ds, index: int, state) -> tuple:
+        if state[3] + 1 >= self.period:
+            state = self.state(ds, index)
+        else:
+            values = ds.column(self.resolve(ds, self.column))
+            center, value = state[0], values[index] - state[0]
+            leaving = values[index - self.period] - center if index >= self.period else 0.0
+            state = center, state[1] + value - leaving, state[2] + value ** 2 - leaving ** 2, state[3] + 1
+        if index < self.period - 1:
+            return state, self._values(np.nan, np.nan)
+        mean = state[1] / self.period
+        return state, self._values(state[0] + mean, max(state[2] / self.period - mean ** 2, 0.0) ** 0.5)
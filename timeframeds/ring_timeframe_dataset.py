@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""This module contain class RingTimeframeDataset representing bounded live history data"""
+import numpy as np
+from timeframeds import TimeframeDataset, TimeframeDatasetError, ColumnarTimeframeDataset
+
+
+class RingTimeframeDataset(ColumnarTimeframeDataset):
+    """Fixed-capacity (ring buffer) ColumnarTimeframeDataset keeping only the last maxlen bars. Appending a bar and
+    amending the open (last) bar are O(1) and never reallocate, so memory use stays flat for long-running processes.
+    Every column buffer holds each bar twice (at positions i and i + maxlen), so the last bars are always available as
+    contiguous column arrays, and all ColumnarTimeframeDataset API works as usual.
+    Note: slices are views, and they are overwritten when the ring wraps around them, use copy() to keep bars.
+    Attached indicators need maxlen to be bigger then their periods"""
+
+    @property
+    def maxlen(self) -> int:
+        return self.__maxlen
+
+    def __init__(self, data, columns: list, tsname: str, timeframe: str, tsunit='s', maxlen=1000):
+        """maxlen: maximum number of bars to keep; for other arguments see ColumnarTimeframeDataset"""
+        if maxlen < 1:
+            raise TimeframeDatasetError("Ring dataset maxlen must be positive!")
+        self.__maxlen = maxlen
+        self.__count = 0
+        super().__init__(data, columns, tsname, timeframe, tsunit)
+        arrays = self._arrays
+        self._arrays = {column: arrays[column][:0] for column in self.columns}
+        self._buffers = {column: np.zeros(2 * maxlen, dtype=arrays[column].dtype) for column in self.columns}
+        self._write(arrays)
+
+    def _write(self, arrays: dict):
+        """Write given (already validated) column arrays into the ring and update the columns views"""
+        count = len(arrays[self.tsname])
+        positions = (self.__count + count - min(count, self.maxlen) + np.arange(min(count, self.maxlen))) % self.maxlen
+        for column in self.columns:
+            values = arrays[column][count - len(positions):]
+            self._buffers[column][positions] = values
+            self._buffers[column][positions + self.maxlen] = values
+        self.__count += count
+        self._refresh()
+        self._updated(count)
+
+    def _refresh(self):
+        """Update the columns views to point to the last bars in the ring"""
+        length = min(self.__count, self.maxlen)
+        start = (self.__count - length) % self.maxlen
+        self._arrays = {column: self._buffers[column][start:start + length] for column in self.columns}
+
+    def append(self, row):
+        """Append given row (list or tuple of columns values) to the end of the dataset, dropping the first bar if
+        dataset is full, O(1). Row timestamp must be bigger then the last one"""
+        if len(row) != len(self.columns):
+            raise TimeframeDatasetError("Given row must have {} items!".format(len(self.columns)))
+        if row[self.tsindex] < 0 or len(self) and row[self.tsindex] <= self._arrays[self.tsname][-1]:
+            raise TimeframeDatasetError("Given row timestamp must be positive and bigger then the last one!")
+        position = self.__count % self.maxlen
+        for idx, column in enumerate(self.columns):
+            self._buffers[column][position] = self._buffers[column][position + self.maxlen] = row[idx]
+        self.__count += 1
+        self._refresh()
+        self._updated(1)
+
+    def extend(self, data):
+        """Append given data (see ColumnarTimeframeDataset.extend()) to the end of the dataset, keeping only the last
+        maxlen bars"""
+        arrays = self.to_arrays(data, self.columns, self.tsname)
+        if not len(arrays[self.tsname]):
+            return
+        report = TimeframeDataset.validate_timestamps(arrays[self.tsname])
+        if not report['ok'] or len(self) and arrays[self.tsname][0] <= self._arrays[self.tsname][-1]:
+            raise TimeframeDatasetError("Given data timestamps must be positive, sorted and bigger then the last one!")
+        self._write(arrays)
+
+    def amend(self, row):
+        """Replace the last row with the given one (e.g. update the still open last bar), O(1). Row timestamp must be
+        equal to the last one"""
+        if len(row) != len(self.columns):
+            raise TimeframeDatasetError("Given row must have {} items!".format(len(self.columns)))
+        if not len(self) or row[self.tsindex] != self._arrays[self.tsname][-1]:
+            raise TimeframeDatasetError("Given row timestamp must be equal to the last one!")
+        position = (self.__count - 1) % self.maxlen
+        for idx, column in enumerate(self.columns):
+            self._buffers[column][position] = self._buffers[column][position + self.maxlen] = row[idx]
+        self._updated(1, amend=True)
+
+    def merge(self, other, policy='replace') -> dict:
+        """Merge given other dataset into this one in place, see ColumnarTimeframeDataset.merge(). Rows that fall before
+        the ring window are dropped and are not reported as inserted"""
+        ts = self._arrays[self.tsname].copy()
+        report = super().merge(other, policy)
+        window = self._arrays[self.tsname]
+        report['inserted'] = int(len(window) - np.count_nonzero(np.isin(window, ts, assume_unique=True)))
+        return report
+
+    def _assign(self, indexes: np.ndarray, arrays: dict):
+        """Replace rows with given indexes with the given column arrays values in place"""
+        positions = (self.__count - len(self) + indexes) % self.maxlen
+        for column in self.columns:
+            self._buffers[column][positions] = self._buffers[column][positions + self.maxlen] = arrays[column]
+
+    def _replace(self, arrays: dict):
+        """Replace all dataset rows with the given (already validated) column arrays, keeping only the last maxlen"""
+        self.__count = 0
+        self._write(arrays)
+
+    def _updated(self, count: int, amend=False):
+        """Update attached indicators. Bars dropped from the ring are not available for the vectorized recomputation,
+        so indicators are updated bar by bar, unless new bars do not fit into the ring"""
+        if amend or count >= len(self):
+            super()._updated(count, amend)
+        else:
+            for indicator in self._indicators:
+                for index in range(len(self) - count, len(self)):
+                    indicator.update(self, index)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""This module contain class SharedTimeframeDataset representing history data shared between processes"""
+import numpy as np
+from timeframeds import TimeframeDataset, TimeframeDatasetError, ColumnarTimeframeDataset
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+
+class SharedTimeframeDataset:
+    """Dataset published once into the shared memory block (multiprocessing.shared_memory, Python 3.8+), so worker
+    processes can attach read-only ColumnarTimeframeDataset views of it without copying and validation. Columns are
+    stored one after another in the block. Publisher owns the block and must unlink() it when workers are done.
+    Workers are expected to be started by the publisher process with multiprocessing.
+    Usage:
+        with SharedTimeframeDataset.publish(ds) as shared:
+            pool.map(worker, [(shared.descriptor, params) for params in sweep])
+        def worker(args):
+            with SharedTimeframeDataset.attach(args[0]) as shared:
+                ds = shared.dataset()
+                ...
+                del ds  # views must be released before the block is closed
+    """
+
+    @property
+    def descriptor(self) -> dict:
+        """Picklable dictionary describing the shared dataset, pass it to the worker processes for attach()"""
+        return dict(self.__descriptor)
+
+    @property
+    def owner(self) -> bool:
+        """True if the block was created by this object with publish()"""
+        return self.__owner
+
+    def __init__(self, shm, descriptor: dict, owner=False):
+        """Use publish() or attach() instead"""
+        self.__shm = shm
+        self.__descriptor = descriptor
+        self.__owner = owner
+
+    @classmethod
+    def publish(cls, tfds, name=None):
+        """Copy given TimeframeDataset or ColumnarTimeframeDataset tfds into the new shared memory block (with given
+        name, or random one) and return the owner SharedTimeframeDataset"""
+        if shared_memory is None:
+            raise TimeframeDatasetError("Shared memory datasets need Python 3.8 or newer!")
+        if isinstance(tfds, TimeframeDataset):
+            tfds = ColumnarTimeframeDataset.from_dataset(tfds)
+        size = sum(tfds.column(column).itemsize for column in tfds.columns) * len(tfds)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(1, size))
+        descriptor = {'name': shm.name, 'length': len(tfds), 'columns': list(tfds.columns), 'tsname': tfds.tsname,
+                      'timeframe': tfds.timeframe.timeframe, 'tsunit': tfds.tsunit}
+        shared = cls(shm, descriptor, owner=True)
+        for column, array in shared._arrays(writeable=True).items():
+            array[:] = tfds.column(column)
+        return shared
+
+    @classmethod
+    def attach(cls, descriptor: dict):
+        """Attach to the shared memory block published with publish() by the given descriptor"""
+        if shared_memory is None:
+            raise TimeframeDatasetError("Shared memory datasets need Python 3.8 or newer!")
+        try:
+            shm = shared_memory.SharedMemory(name=descriptor['name'], track=False)
+        except TypeError:  # Python < 3.13, block is tracked by the resource tracker shared with the publisher process
+            shm = shared_memory.SharedMemory(name=descriptor['name'])
+        return cls(shm, dict(descriptor))
+
+    def _arrays(self, writeable=False) -> dict:
+        """Return dictionary {column name: array} of the columns arrays over the shared memory block"""
+        arrays, offset, length = {}, 0, self.__descriptor['length']
+        for column in self.__descriptor['columns']:
+            dtype = ColumnarTimeframeDataset.tsdtype if column == self.__descriptor['tsname'] \
+                else ColumnarTimeframeDataset.dtype
+            arrays[column] = np.ndarray(length, dtype=dtype, buffer=self.__shm.buf, offset=offset)
+            arrays[column].flags.writeable = writeable
+            offset += arrays[column].nbytes
+        return arrays
+
+    def dataset(self) -> ColumnarTimeframeDataset:
+        """Return read-only ColumnarTimeframeDataset over the shared memory block, without copying and validation,
+        O(1). Use copy() to get the changeable one"""
+        d = self.__descriptor
+        return ColumnarTimeframeDataset.from_arrays(self._arrays(), d['columns'], d['tsname'], d['timeframe'],
+                                                    d['tsunit'])
+
+    def close(self):
+        """Close access to the shared memory block from this process. Datasets returned by dataset() must be deleted
+        before"""
+        self.__shm.close()
+
+    def unlink(self):
+        """Destroy the shared memory block, it must be called once by the owner when all processes are done"""
+        self.__shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        if self.owner:
+            self.unlink()
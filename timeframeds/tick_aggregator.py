@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""This module contain class TickAggregator building timeframe candles from the stream of ticks (trades)"""
+from itertools import islice
+import numpy as np
+from timeframeds import Timeframe, TimeframeDatasetError, ColumnarTimeframeDataset
+
+
+class TickAggregator:
+    """Streaming ticks to candles aggregator. Ticks (trades) are (timestamp, price, amount) tuples, ticks timestamps are
+    measured in tsunit. Only the open (last) bar is kept in memory while aggregating, closed bars are appended to the
+    dataset (ColumnarTimeframeDataset) and passed to the callback(row) one by one. Bars are bucketed with
+    Timeframe.starts() (the same way as Timeframe.borders() do), volume is the sum of absolute tick amounts (sell
+    amounts are negative on some exchanges). Bars without ticks are not created. Usage:
+        aggregator = TickAggregator('1m', tsunit='ms', callback=print)
+        aggregator.add_batch(timestamps, prices, amounts)  # NumPy arrays, fast
+        aggregator.add(timestamp, price, amount)  # single tick
+        aggregator.dataset.get_dict(-1)
+    """
+
+    @property
+    def dataset(self) -> ColumnarTimeframeDataset:
+        return self.__dataset
+
+    @property
+    def timeframe(self) -> Timeframe:
+        return self.__dataset.timeframe
+
+    @property
+    def open_bar(self):
+        """The open (not yet closed) bar row, or None if there is no open bar"""
+        return list(self.__bar) if self.__bar is not None else None
+
+    @property
+    def late(self) -> int:
+        """Number of ticks dropped because they belong to already closed bars"""
+        return self.__late
+
+    def __init__(self, timeframe: str, columns=None, tsname='Timestamp', tsunit='s', callback=None, dataset=None):
+        """columns: list of resulting dataset columns names, must contain open, high, low, close and volume columns
+        (case insensitive) and tsname; dataset: ColumnarTimeframeDataset to append closed bars to"""
+        columns = columns or [tsname, 'Open', 'High', 'Low', 'Close', 'Volume']
+        self.__dataset = dataset if dataset is not None else \
+            ColumnarTimeframeDataset([], columns=columns, tsname=tsname, timeframe=timeframe, tsunit=tsunit)
+        names = {column.lower(): idx for idx, column in enumerate(self.__dataset.columns)}
+        if any(name not in names for name in ('open', 'high', 'low', 'close', 'volume')):
+            raise TimeframeDatasetError("Columns must contain Open, High, Low, Close and Volume!")
+        self.__indexes = [self.__dataset.tsindex] + [names[name] for name in ('open', 'high', 'low', 'close', 'volume')]
+        self.__factor = round(1 / self.__dataset.tscoef)
+        self.__callback = callback
+        self.__bar = None
+        self.__end = 0
+        self.__late = 0
+        self.__closed = 0  # end of the last closed bar, ticks before it are late
+        if len(self.__dataset):
+            self.__closed = self._bar_end(int(self.__dataset.column(self.__dataset.tsname)[-1]))
+
+    def _bounds(self, timestamps) -> tuple:
+        """Return bar (start, end) bounds (in ticks timestamp units) for given ticks timestamps"""
+        starts = self.timeframe.starts(np.asarray(timestamps) // self.__factor)
+        return starts * self.__factor, self.timeframe.ends(starts) * self.__factor
+
+    def _bar_end(self, start) -> int:
+        """Return end (in ticks timestamp units) of the bar with given start (in ticks timestamp units)"""
+        return int(self.timeframe.ends(start // self.__factor)) * self.__factor
+
+    def _first(self) -> int:
+        """Return the first timestamp (in ticks timestamp units) not belonging to the closed bars"""
+        return self.__bar[self.__indexes[0]] if self.__bar is not None else self.__closed
+
+    def _row(self, start, open_, high, low, close, volume) -> list:
+        """Return dataset row with given bar values"""
+        row = [np.nan] * len(self.__dataset.columns)
+        for idx, value in zip(self.__indexes, (start, open_, high, low, close, volume)):
+            row[idx] = value
+        return row
+
+    def _close(self, rows: list):
+        """Append given closed bars rows to the dataset and pass them to the callback"""
+        if rows:
+            self.__dataset.extend(rows)
+            self.__closed = self._bar_end(rows[-1][self.__indexes[0]])
+            if self.__callback is not None:
+                for row in rows:
+                    self.__callback(row)
+
+    def add(self, timestamp, price, amount):
+        """Add single tick"""
+        if timestamp < self._first():
+            self.__late += 1
+        elif self.__bar is not None and timestamp < self.__end:
+            _, _, high, low, close, volume = self.__indexes
+            self.__bar[high] = max(self.__bar[high], price)
+            self.__bar[low] = min(self.__bar[low], price)
+            self.__bar[close] = price
+            self.__bar[volume] += abs(amount)
+        else:
+            if self.__bar is not None:
+                self._close([self.__bar])
+            start, end = self.timeframe.span(timestamp // self.__factor)
+            self.__bar = self._row(start * self.__factor, price, price, price, price, abs(amount))
+            self.__end = end * self.__factor
+
+    def add_batch(self, timestamps, prices, amounts):
+        """Add batch of ticks given as arrays of timestamps, prices and amounts, vectorized"""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        amounts = np.abs(np.asarray(amounts, dtype=np.float64))
+        if np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, prices, amounts = timestamps[order], prices[order], amounts[order]
+        late = np.searchsorted(timestamps, self._first())
+        if late:
+            self.__late += int(late)
+            timestamps, prices, amounts = timestamps[late:], prices[late:], amounts[late:]
+        if not len(timestamps):
+            return
+        starts, ends = self._bounds(timestamps)
+        first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+        last = np.r_[first[1:] - 1, len(timestamps) - 1]
+        bars = [starts[first], prices[first], np.maximum.reduceat(prices, first), np.minimum.reduceat(prices, first),
+                prices[last], np.add.reduceat(amounts, first)]
+        bars = [values.tolist() for values in bars]
+        if self.__bar is not None and bars[0][0] == self.__bar[self.__indexes[0]]:
+            # First bar of the batch continues the open bar
+            _, open_, high, low, close, volume = self.__indexes
+            bars[1][0] = self.__bar[open_]
+            bars[2][0] = max(bars[2][0], self.__bar[high])
+            bars[3][0] = min(bars[3][0], self.__bar[low])
+            bars[5][0] += self.__bar[volume]
+        elif self.__bar is not None:
+            self._close([self.__bar])
+        rows = [self._row(*bar) for bar in zip(*bars)]
+        self._close(rows[:-1])
+        self.__bar, self.__end = rows[-1], int(ends[-1])
+
+    def consume(self, ticks, batch_size=100000):
+        """Add ticks from the given iterable of (timestamp, price, amount) tuples, batch by batch"""
+        ticks = iter(ticks)
+        while True:
+            batch = list(islice(ticks, batch_size))
+            if not batch:
+                break
+            self.add_batch(*zip(*batch))
+
+    def flush(self, timestamp=None):
+        """Close the open bar if given timestamp (in ticks timestamp units) is after the open bar end, or close it
+        unconditionally if timestamp is not given"""
+        if self.__bar is not None and (timestamp is None or timestamp >= self.__end):
+            self._close([self.__bar])
+            self.__bar = None
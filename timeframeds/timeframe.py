@@ -1,8 +1,10 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """This module contain class Timeframe representing typical exchanges timeframes"""
-import time
+import calendar
 import datetime
+import time
+import numpy as np
 from timefuncs import gmtdt
 
 
@@ -25,6 +27,7 @@ class Timeframe:
         self.__timecode = tcp['timecode']
         self.__period = tcp['period']
         self.__duration = tcp['duration']
+        self.__span = (0, 0)
 
     @property
     def timecode(self):
@@ -38,6 +41,12 @@ class Timeframe:
     def duration(self):
         return self.__duration
 
+    @property
+    def anchor(self) -> int:
+        """Timestamp the timeframe bars are aligned to: Monday 1970-01-05 for weeks and multi-day timeframes, and the
+        epoch for others (months are aligned to the calendar months)"""
+        return 4 * self.timecodes()['D'] if self.timecode == 'W' or self.timecode == 'D' and self.period > 1 else 0
+
     @staticmethod
     def timecodes() -> dict:
         """Return the string containing allowed timeframe time codes with duration, (m for minutes, D for days, etc)
@@ -75,31 +84,85 @@ class Timeframe:
     def __init__(self, timeframe: str):
         self.timeframe = timeframe
 
-    def borders(self, timestamp=time.time()) -> dict:
-        """Return timeframe start, end timestamps (time borders) for the given timestamp (start <= timestamp < end)"""
-        dtob = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc).replace(microsecond=0)
-        if self.timecode == 'm':
-            start_time_part = self.period * (dtob.minute // self.period)
-            start_dtob = dtob.replace(minute=start_time_part, second=0, microsecond=0)
-        elif self.timecode == 'h':
-            start_time_part = self.period * (dtob.hour // self.period)
-            start_dtob = dtob.replace(hour=start_time_part, minute=0, second=0, microsecond=0)
-        elif self.timecode == 'D' and self.period == 1:
-            start_dtob = dtob.replace(hour=0, minute=0, second=0, microsecond=0)
-        else:
-            raise TimeframeError('Can not get start date object for this timeframe!')
-        start = int(start_dtob.timestamp())
-        end = start + self.duration
-        iso_ts = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc).isoformat()
-        iso_start = datetime.datetime.fromtimestamp(start, tz=datetime.timezone.utc).isoformat()[:-9]
-        iso_end = datetime.datetime.fromtimestamp(end, tz=datetime.timezone.utc).isoformat()[:-9]
+    def borders(self, timestamp=None, iso=True) -> dict:
+        """Return timeframe start, end timestamps (time borders) for the given timestamp (start <= timestamp < end,
+        current time by default). ISO-formatted strings are added only if iso is True, see also span() for the fastest
+        variant"""
+        timestamp = time.time() if timestamp is None else timestamp
+        start, end = self.span(timestamp)
         secs_passed = timestamp - start
         secs_remain = end - timestamp
-        pcnt_passed = 100 * secs_passed / self.duration
-        pcnt_remain = 100 * secs_remain / self.duration
-        return {'start': start, 'end': end, 'iso_start': iso_start, 'iso_end': iso_end, 'iso_timestamp': iso_ts,
-                'secs_passed': secs_passed, 'secs_remain': secs_remain, 'timestamp': timestamp,
-                'pcnt_passed': pcnt_passed, 'pcnt_remain': pcnt_remain}
+        res = {'start': start, 'end': end, 'secs_passed': secs_passed, 'secs_remain': secs_remain,
+               'timestamp': timestamp, 'pcnt_passed': 100 * secs_passed / (end - start),
+               'pcnt_remain': 100 * secs_remain / (end - start)}
+        if iso:
+            res['iso_timestamp'] = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc).isoformat()
+            res['iso_start'] = datetime.datetime.fromtimestamp(start, tz=datetime.timezone.utc).isoformat()[:-9]
+            res['iso_end'] = datetime.datetime.fromtimestamp(end, tz=datetime.timezone.utc).isoformat()[:-9]
+        return res
+
+    def span(self, timestamp=None) -> tuple:
+        """Return tuple (start, end) of the timeframe bar containing given timestamp (start <= timestamp < end, current
+        time by default). Fast scalar variant of borders(): pure arithmetic, and the last result is cached for the
+        following timestamps inside the same bar"""
+        timestamp = time.time() if timestamp is None else timestamp
+        start, end = self.__span
+        if start <= timestamp < end:
+            return self.__span
+        if self.timecode == 'M':
+            dtob = datetime.datetime.fromtimestamp(timestamp // 1, tz=datetime.timezone.utc)
+            months = (dtob.year * 12 + dtob.month - 1) // self.period * self.period
+            start = calendar.timegm((months // 12, months % 12 + 1, 1, 0, 0, 0))
+            months += self.period
+            end = calendar.timegm((months // 12, months % 12 + 1, 1, 0, 0, 0))
+        else:
+            start = int((timestamp - self.anchor) // self.duration * self.duration + self.anchor)
+            end = start + self.duration
+        self.__span = (start, end)
+        return self.__span
+
+    def bounds(self, timestamps) -> tuple:
+        """Return tuple (starts, ends) of arrays with the timeframe bars borders for the given array of timestamps,
+        vectorized variant of span()"""
+        starts = self.starts(timestamps)
+        return starts, self.ends(starts)
+
+    def starts(self, timestamps) -> np.ndarray:
+        """Return timeframe start timestamps for the given array of timestamps (in seconds), vectorized. Minutes, hours
+        and days are aligned to the epoch (as in borders()), weeks and multi-day timeframes to Monday (1970-01-05),
+        months to the calendar months"""
+        timestamps = np.floor(timestamps).astype(np.int64)
+        if self.timecode == 'M':
+            months = timestamps.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+            months = months // self.period * self.period
+            return months.astype('datetime64[M]').astype('datetime64[s]').astype(np.int64)
+        return (timestamps - self.anchor) // self.duration * self.duration + self.anchor
+
+    def ends(self, starts) -> np.ndarray:
+        """Return timeframe end timestamps for the given array of timeframe start timestamps (see starts())"""
+        starts = np.asarray(starts, dtype=np.int64)
+        if self.timecode == 'M':
+            months = starts.astype('datetime64[s]').astype('datetime64[M]') + self.period
+            return months.astype('datetime64[s]').astype(np.int64)
+        return starts + self.duration
+
+    def shift(self, starts, bars=1) -> np.ndarray:
+        """Return start timestamps of the bars located given number of bars after (or before, if bars is negative) the
+        bars with the given start timestamps, vectorized"""
+        starts = np.asarray(starts, dtype=np.int64)
+        if self.timecode == 'M':
+            months = starts.astype('datetime64[s]').astype('datetime64[M]') + bars * self.period
+            return months.astype('datetime64[s]').astype(np.int64)
+        return starts + bars * self.duration
+
+    def count(self, starts, ends) -> np.ndarray:
+        """Return number of bars between the given bars borders (start <= bar start < end), vectorized"""
+        starts, ends = np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)
+        if self.timecode == 'M':
+            months = [borders.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+                      for borders in (starts, ends)]
+            return -((months[0] - months[1]) // self.period)
+        return -((starts - ends) // self.duration)
 
     def fmt(self, timestamp=time.time(), fmt='human') -> str:
         """Format given timestamp into the human-readable form based on current Timeframe"""
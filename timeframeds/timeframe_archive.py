@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""This module contain class TimeframeArchive representing compact compressed history data file"""
+import json
+import os
+import struct
+import tempfile
+import zlib
+import numpy as np
+from timeframeds import TimeframeDataset, TimeframeDatasetError, ColumnarTimeframeDataset
+
+
+class TimeframeArchive:
+    """Compact columnar archive of the history data. Bars are stored in blocks of block_size rows, every column of the
+    block is encoded and compressed with zlib separately: timestamps are delta-of-delta encoded (regular bars give
+    zeros), prices and other values are converted into the fixed-point integers (with the smallest number of decimals
+    that keeps values exact) and delta encoded, integers are stored in the smallest integer type that fits. Columns
+    with values that can not be stored exactly (NaN, too many decimals) are stored as is. Block index (blocks offsets,
+    timestamps ranges and encodings) is kept at the end of the file, so time range reads decode only the blocks they
+    need. The file is append-only: append() writes new blocks, new index and new footer after the last footer and never
+    overwrites them, the archive is opened with the last valid footer, so interrupted append leaves the previous state
+    readable. Small trailing block is re-encoded together with the appended rows instead of adding tiny blocks, the
+    replaced blocks and indexes are left in the file as unused space, compact() rewrites the file without it. File
+    layout: MAGIC, header length (uint32) and header JSON, then one or more times: blocks, index JSON, index offset
+    (uint64) and MAGIC. Usage:
+        TimeframeArchive.write('btcusd-1m.tfda', ds)
+        archive = TimeframeArchive('btcusd-1m.tfda')
+        archive.append(new_bars)
+        ds = archive.read(start, end)
+    """
+
+    MAGIC = b'TFDA'
+    """Magic bytes the file starts and ends with"""
+
+    VERSION = 1
+    """File format version"""
+
+    MAX_DECIMALS = 10
+    """Maximum number of decimals of the fixed-point values"""
+
+    SMALL_BLOCK = 4096
+    """Trailing block with less rows (and less then block_size rows) is re-encoded together with the appended rows"""
+
+    SCAN_CHUNK = 65536
+    """Size of the chunks the file is read with while looking for the last valid footer"""
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def columns(self) -> list:
+        return self.__header['columns']
+
+    @property
+    def tsname(self) -> str:
+        return self.__header['tsname']
+
+    @property
+    def timeframe(self) -> str:
+        return self.__header['timeframe']
+
+    @property
+    def tsunit(self) -> str:
+        return self.__header['tsunit']
+
+    @property
+    def blocks(self) -> list:
+        """Block index: list of dictionaries with block offset, rows number, first and last timestamps (in tsunit) and
+        columns encodings"""
+        return self.__blocks
+
+    def __init__(self, path: str):
+        """Open existing archive file with given path"""
+        self.__path = path
+        with open(path, 'rb') as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                raise TimeframeDatasetError("File {} is not a TimeframeDataset archive!".format(path))
+            self.__header = json.loads(f.read(struct.unpack('<I', f.read(4))[0]).decode('utf-8'))
+            if self.__header.get('version') != self.VERSION:
+                raise TimeframeDatasetError("Archive {} format version {} is not supported!".format(
+                    path, self.__header.get('version')))
+            start = f.tell()
+            for end in self._magics(f, start):
+                f.seek(end - 8 - len(self.MAGIC))
+                offset = struct.unpack('<Q', f.read(8))[0] if end - 8 - len(self.MAGIC) >= start else -1
+                if start <= offset <= end - 8 - len(self.MAGIC):
+                    f.seek(offset)
+                    try:
+                        blocks = json.loads(f.read(end - 8 - len(self.MAGIC) - offset).decode('utf-8'))
+                    except ValueError:
+                        continue
+                    if isinstance(blocks, list):
+                        self.__blocks, self.__end = blocks, end
+                        break
+            else:
+                raise TimeframeDatasetError("Archive {} is truncated!".format(path))
+
+    @classmethod
+    def _magics(cls, f, start: int):
+        """Yield end positions of MAGIC occurrences in the given file f after the start position, from the end of the
+        file to the start"""
+        end = f.seek(0, os.SEEK_END)
+        while end - start >= len(cls.MAGIC):
+            low = max(start, end - cls.SCAN_CHUNK)
+            f.seek(low)
+            chunk = f.read(end - low)
+            position = chunk.rfind(cls.MAGIC)
+            while position >= 0:
+                yield low + position + len(cls.MAGIC)
+                position = chunk.rfind(cls.MAGIC, 0, position + len(cls.MAGIC) - 1)
+            end = low + len(cls.MAGIC) - 1
+
+    @classmethod
+    def create(cls, path: str, columns: list, tsname: str, timeframe: str, tsunit='s', block_size=65536, level=6):
+        """Create new empty archive (overwriting existing file) with given path and dataset settings and open it.
+        block_size: number of rows in block; level: zlib compression level"""
+        TimeframeDataset.timestamp_coefficient(tsunit)
+        if tsname not in columns:
+            raise TimeframeDatasetError("Columns must contain {} column!".format(tsname))
+        header = json.dumps({'version': cls.VERSION, 'columns': columns, 'tsname': tsname, 'timeframe': timeframe,
+                             'tsunit': tsunit, 'block_size': block_size, 'level': level}).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(cls.MAGIC + struct.pack('<I', len(header)) + header)
+            cls._write_index(f, [])
+        return cls(path)
+
+    @classmethod
+    def write(cls, path: str, tfds, block_size=65536, level=6):
+        """Write given TimeframeDataset or ColumnarTimeframeDataset tfds into the new archive with given path and open
+        it"""
+        archive = cls.create(path, tfds.columns, tfds.tsname, tfds.timeframe.timeframe, tfds.tsunit, block_size, level)
+        archive.append(tfds)
+        return archive
+
+    @classmethod
+    def _write_index(cls, f, blocks: list):
+        """Write given block index and the file footer at the current position of the given file f"""
+        offset = f.tell()
+        f.write(json.dumps(blocks).encode('utf-8') + struct.pack('<Q', offset) + cls.MAGIC)
+
+    def __len__(self):
+        return sum(block['rows'] for block in self.blocks)
+
+    @staticmethod
+    def _int_array(values: np.ndarray) -> np.ndarray:
+        """Return given integer values array converted to the smallest integer type keeping values"""
+        if not len(values):
+            return values.astype(np.int8)
+        low, high = values.min(), values.max()
+        for dtype in (np.int8, np.int16, np.int32):
+            if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                return values.astype(dtype)
+        return values.astype(np.int64)
+
+    @classmethod
+    def _decimals(cls, values: np.ndarray):
+        """Return the smallest number of decimals keeping given float values exact as fixed-point integers, or None"""
+        if not np.all(np.isfinite(values)):
+            return None
+        for decimals in range(cls.MAX_DECIMALS + 1):
+            scaled = np.round(values * 10.0 ** decimals)
+            if np.all(np.abs(scaled) < 2 ** 53) and np.array_equal(scaled / 10.0 ** decimals, values):
+                return decimals
+        return None
+
+    def _encode(self, column: str, values: np.ndarray) -> tuple:
+        """Return tuple (column encoding dictionary, compressed bytes) for the given block column values"""
+        if column == self.tsname:
+            deltas = np.diff(values)
+            encoding = {'encoding': 'dod', 'first': int(values[0]), 'delta': int(deltas[0]) if len(deltas) else 0}
+            payload = self._int_array(np.diff(deltas))
+        else:
+            decimals = self._decimals(values)
+            if decimals is None:
+                encoding, payload = {'encoding': 'raw'}, values.astype('<f8')
+            else:
+                scaled = np.round(values * 10.0 ** decimals).astype(np.int64)
+                encoding = {'encoding': 'delta', 'decimals': decimals, 'first': int(scaled[0])}
+                payload = self._int_array(np.diff(scaled))
+        encoding['dtype'] = payload.dtype.newbyteorder('<').str
+        data = zlib.compress(payload.astype(encoding['dtype']).tobytes(), self.__header['level'])
+        encoding['size'] = len(data)
+        return encoding, data
+
+    def _decode(self, encoding: dict, data: bytes, rows: int) -> np.ndarray:
+        """Return column values decoded from the given compressed bytes with the given column encoding"""
+        payload = np.frombuffer(zlib.decompress(data), dtype=encoding['dtype'])
+        if encoding['encoding'] == 'raw':
+            return payload.astype(np.float64)
+        values = np.empty(rows, dtype=np.int64)
+        values[0] = encoding['first']
+        if encoding['encoding'] == 'dod':
+            if rows > 1:
+                deltas = np.empty(rows - 1, dtype=np.int64)
+                deltas[0] = encoding['delta']
+                np.cumsum(payload, out=deltas[1:])
+                deltas[1:] += encoding['delta']
+                np.cumsum(deltas, out=values[1:])
+                values[1:] += encoding['first']
+            return values
+        np.cumsum(payload, out=values[1:])
+        values[1:] += encoding['first']
+        return values / 10.0 ** encoding['decimals']
+
+    def append(self, data):
+        """Append given data (TimeframeDataset, ColumnarTimeframeDataset, list of lists or tuples, or dictionary of
+        column values) to the end of the archive. Data timestamps must be sorted and bigger then the last one"""
+        if isinstance(data, TimeframeDataset):
+            data = data.data
+        elif isinstance(data, ColumnarTimeframeDataset):
+            data = {column: data.column(column) for column in data.columns}
+        arrays = ColumnarTimeframeDataset.to_arrays(data, self.columns, self.tsname)
+        ts = arrays[self.tsname]
+        report = TimeframeDataset.validate_timestamps(ts)
+        if not report['ok'] or len(ts) and self.blocks and ts[0] <= self.blocks[-1]['end']:
+            raise TimeframeDatasetError("Given data timestamps must be positive, sorted and bigger then the last one!")
+        blocks, size = list(self.blocks), self.__header['block_size']
+        if len(ts) and blocks and blocks[-1]['rows'] < min(size, self.SMALL_BLOCK):
+            tail = self._read_block(blocks.pop())
+            arrays = {column: np.concatenate((tail[column], arrays[column])) for column in self.columns}
+            ts = arrays[self.tsname]
+        payloads, offset = [], self.__end
+        for start in range(0, len(ts), size):
+            stop = min(start + size, len(ts))
+            block = {'offset': offset, 'rows': stop - start, 'start': int(ts[start]), 'end': int(ts[stop - 1]),
+                     'columns': []}
+            for column in self.columns:
+                encoding, payload = self._encode(column, arrays[column][start:stop])
+                block['columns'].append(encoding)
+                payloads.append(payload)
+                offset += len(payload)
+            blocks.append(block)
+        if not payloads:
+            return
+        with open(self.path, 'r+b') as f:
+            f.seek(self.__end)
+            f.write(b''.join(payloads))
+            self._write_index(f, blocks)
+            end = f.tell()
+            f.truncate()
+        self.__end, self.__blocks = end, blocks
+
+    def _read_block(self, block: dict) -> dict:
+        """Return dictionary of the decoded column values of the given block"""
+        with open(self.path, 'rb') as f:
+            f.seek(block['offset'])
+            return {column: self._decode(encoding, f.read(encoding['size']), block['rows'])
+                    for column, encoding in zip(self.columns, block['columns'])}
+
+    def compact(self):
+        """Rewrite the archive without the unused space left by appends. The new file replaces the old one atomically"""
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix='.tfda')
+        os.close(fd)
+        try:
+            archive = self.create(tmp, self.columns, self.tsname, self.timeframe, self.tsunit,
+                                  self.__header['block_size'], self.__header['level'])
+            with open(self.path, 'rb') as source, open(tmp, 'r+b') as f:
+                f.seek(archive.__end)
+                blocks, offset = [], archive.__end
+                for block in self.blocks:
+                    source.seek(block['offset'])
+                    data = source.read(sum(encoding['size'] for encoding in block['columns']))
+                    f.write(data)
+                    blocks.append(dict(block, offset=offset))
+                    offset += len(data)
+                self._write_index(f, blocks)
+                f.truncate()
+            os.replace(tmp, self.path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.__init__(self.path)
+
+    def read(self, start=None, end=None, columnar=True):
+        """Return dataset with the bars started at start <= timestamp < end (in seconds, whole archive by default).
+        Only blocks overlapping the given time range are read and decoded. Return ColumnarTimeframeDataset if columnar
+        is True, TimeframeDataset otherwise"""
+        factor = round(1 / TimeframeDataset.timestamp_coefficient(self.tsunit))
+        low = start * factor if start is not None else None
+        high = end * factor if end is not None else None
+        chunks = {column: [] for column in self.columns}
+        with open(self.path, 'rb') as f:
+            for block in self.blocks:
+                if low is not None and block['end'] < low or high is not None and block['start'] >= high:
+                    continue
+                f.seek(block['offset'])
+                values = {column: self._decode(encoding, f.read(encoding['size']), block['rows'])
+                          for column, encoding in zip(self.columns, block['columns'])}
+                ts = values[self.tsname]
+                first = np.searchsorted(ts, low) if low is not None else 0
+                last = np.searchsorted(ts, high) if high is not None else len(ts)
+                for column in self.columns:
+                    chunks[column].append(values[column][first:last])
+        arrays = {column: np.concatenate(chunks[column]) if chunks[column] else [] for column in self.columns}
+        ds = ColumnarTimeframeDataset.from_arrays(
+            ColumnarTimeframeDataset.to_arrays(arrays, self.columns, self.tsname), self.columns, self.tsname,
+            self.timeframe, self.tsunit)
+        return ds if columnar else ds.to_dataset()
@@ -3,6 +3,8 @@
 """This module contain class HistoryDataset representing history data"""
 import time
 from collections import UserList
+from operator import itemgetter
+import numpy as np
 from timeframeds import Timeframe
 from timefuncs import gmtdt
 
@@ -18,6 +20,9 @@ class WrongTimestampUnit(Exception):
 class TimeframeDataset(UserList):
     """Class for work with history data. Provide handy functions to work with history dataset"""
 
+    partial = False
+    """True if the last bar is partial: it was aggregated (see resample()) not from all of its base bars"""
+
     @property
     def columns(self):
         return self.__columns
@@ -62,8 +67,10 @@ class TimeframeDataset(UserList):
 
     def __init__(self, data: list, columns: list, tsname: str, timeframe: str, tsunit='s'):
         """data: list of lists or tuples; column_names: list of strings with column names"""
-        if not TimeframeDataset.is_data_ok(data, columns, tsname):
-            raise TimeframeDatasetError("Given data is not ok!")
+        report = TimeframeDataset.validate_data(data, columns, tsname)
+        if not report['ok']:
+            raise TimeframeDatasetError("Given data is not ok! First wrong item index: {}, reason: {}".format(
+                report['first_bad_index'], report['reason']))
         self.columns = columns
         self.tsname = tsname
         self.timeframe = Timeframe(timeframe)
@@ -71,12 +78,34 @@ class TimeframeDataset(UserList):
         super().__init__(data)
 
     def __getitem__(self, i):
-        if isinstance(i, slice):
+        if isinstance(i, slice) and (i.step or 1) > 0:
+            # Ascending slice of valid data is valid too, so rows are shared with this dataset without revalidation
+            ds = self._derive(self.data[i])
+            ds.partial = self.partial and i.indices(len(self))[1] >= len(self) > 0 and len(ds) > 0
+            return ds
+        elif isinstance(i, slice):
             return self.__class__(self.data[i], columns=self.columns, tsname=self.tsname,
                                   timeframe=self.timeframe.timeframe, tsunit=self.tsunit)
         else:
             return self.data[i]
 
+    def _derive(self, data: list):
+        """Return new dataset with the same columns, timestamp and timeframe settings for the given data, that is
+        already known to be valid. Validation and timeframe parsing are skipped"""
+        ds = self.__class__.__new__(self.__class__)
+        ds.columns = self.columns
+        ds.tsname = self.tsname
+        ds.timeframe = self.timeframe
+        ds.tsunit = self.tsunit
+        ds.data = data
+        return ds
+
+    def copy(self):
+        """Return copy of the dataset. Unlike slices, rows of the copy are not shared with this dataset"""
+        ds = self._derive([list(item) for item in self.data])
+        ds.partial = self.partial
+        return ds
+
     def get_dict(self, index=-1, timestamp_format=None) -> dict:
         """Return dictionary with data from given index. Timestamp formatted according given timestamp_format"""
         # @todo fix method, it fails when self.data is empty, add tests
@@ -106,22 +135,48 @@ class TimeframeDataset(UserList):
     @staticmethod
     def is_data_ok(data: list, columns: list, tsname: str, duration=0) -> bool:
         """Check given data is ok to be TimeframeDataset"""
+        return TimeframeDataset.validate_data(data, columns, tsname, duration)['ok']
+
+    @staticmethod
+    def validate_data(data: list, columns: list, tsname: str, duration=0) -> dict:
+        """Check given data is ok to be TimeframeDataset and return validation report (see validate_timestamps()).
+        Data items must be lists (tuples) of columns length, and their timestamps are checked vectorized"""
         columns_len = len(columns)
         tsindex = columns.index(tsname)
-        tsvalue_previous = -1
-        res = True
-        for _, item in enumerate(data):
-            res = res and (isinstance(item, list) or isinstance(item, tuple))  # check all data items are lists (tuples)
-            res = res and (columns_len == len(item))  # check length for columns and each item
-            res = res and (item[tsindex] >= 0)  # check timestamp is positive
-            res = res and (tsvalue_previous < item[tsindex])  # check data is sorted by timestamp
-            if duration and tsvalue_previous >= 0:
-                res = res and (duration == item[tsindex] - tsvalue_previous)  # check timestamps are stepped by duration
-                # that is to say, no time gaps between candles
-            if not res:
-                break
-            tsvalue_previous = item[tsindex]
-        return res
+        if not set(map(type, data)) <= {list, tuple} or set(map(len, data)) - {columns_len}:
+            for index, item in enumerate(data):
+                if not isinstance(item, (list, tuple)) or columns_len != len(item):
+                    report = TimeframeDataset.validate_timestamps(
+                        np.array([row[tsindex] for row in data[:index]]), duration)
+                    if report['ok']:
+                        report.update(ok=False, first_bad_index=index, reason='item')
+                    return report
+        return TimeframeDataset.validate_timestamps(np.array(list(map(itemgetter(tsindex), data))), duration)
+
+    @staticmethod
+    def validate_timestamps(ts: np.ndarray, duration=0) -> dict:
+        """Vectorized check of given timestamps array: timestamps must be positive, sorted ascending and (if duration
+        is given, in timestamp units) stepped by duration. Return validation report dictionary:
+            ok - True if all checks passed,
+            first_bad_index - index of the first wrong timestamp (None if all is ok),
+            reason - why the first wrong timestamp is wrong: 'item', 'negative', 'order' or 'step' (None if all is ok),
+            gaps - indexes of timestamps that have a time gap before them (only if duration is given),
+            duplicates - timestamps values that appears in data more then once
+        """
+        ts = np.asarray(ts)
+        diff = ts[1:] - ts[:-1]
+        bad = {'negative': np.flatnonzero(ts < 0), 'order': np.flatnonzero(diff <= 0) + 1}
+        if duration:
+            bad['step'] = np.flatnonzero(diff != duration) + 1
+            gaps = np.flatnonzero(diff > duration) + 1
+        else:
+            gaps = np.empty(0, dtype=np.int64)
+        first_bad_index, reason = None, None
+        for name, indexes in bad.items():
+            if len(indexes) and (first_bad_index is None or indexes[0] < first_bad_index):
+                first_bad_index, reason = int(indexes[0]), name
+        return {'ok': first_bad_index is None, 'first_bad_index': first_bad_index, 'reason': reason, 'gaps': gaps,
+                'duplicates': np.unique(ts[1:][diff == 0])}
 
     @staticmethod
     def timestamp_coefficient(tsunit: str) -> float:
@@ -136,11 +191,109 @@ class TimeframeDataset(UserList):
         """Same as TimeframeDataset.is_data_ok() but not static"""
         return TimeframeDataset.is_data_ok(self.data, self.columns, self.tsname)
 
-    def is_inside(self, timestamp=time.time(), index=-1):
-        """Chek given timestamp is inside given index"""
+    def validate(self, continuous=False) -> dict:
+        """Same as TimeframeDataset.validate_data() but not static. If continuous is True, also check timestamps are
+        stepped by timeframe duration and report gaps"""
+        duration = round(self.timeframe.duration / self.tscoef) if continuous else 0
+        return TimeframeDataset.validate_data(self.data, self.columns, self.tsname, duration)
+
+    def is_inside(self, timestamp=None, index=-1):
+        """Chek given timestamp (current time by default) is inside given index"""
+        timestamp = time.time() if timestamp is None else timestamp
         return self.data[index][self.tsindex] * self.tscoef <= timestamp < \
                self.data[index][self.tsindex] * self.tscoef + self.timeframe.duration
 
+    def _to_tsunit(self, timestamp):
+        """Convert given timestamp (in seconds) into the dataset timestamp units"""
+        return timestamp * round(1 / self.tscoef)
+
+    def _bisect(self, value, right=False) -> int:
+        """Binary search of the insertion point for the given value (in dataset timestamp units) into the timestamps,
+        same as bisect.bisect_left() (or bisect.bisect_right() if right is True)"""
+        lo, hi = 0, len(self.data)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.data[mid][self.tsindex] < value or (right and self.data[mid][self.tsindex] == value):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def locate(self, timestamp):
+        """Return index of the bar containing given timestamp (in seconds), or None if there is no such bar"""
+        index = self.asof(timestamp)
+        return index if index is not None and self.is_inside(timestamp, index) else None
+
+    def asof(self, timestamp):
+        """Return index of the last bar started at or before given timestamp (in seconds), or None if there is no
+        such bar"""
+        index = self._bisect(self._to_tsunit(timestamp), right=True) - 1
+        return index if index >= 0 else None
+
+    def between(self, start, end):
+        """Return slice (view) of the dataset with bars started at start <= timestamp < end (in seconds)"""
+        return self[self._bisect(self._to_tsunit(start)):self._bisect(self._to_tsunit(end))]
+
+    @staticmethod
+    def merge_policies() -> tuple:
+        """Return the tuple containing allowed merge() policies"""
+        return 'replace', 'keep', 'error'
+
+    def merge(self, other, policy='replace') -> dict:
+        """Merge given other dataset (TimeframeDataset, ColumnarTimeframeDataset or list of rows with the same columns
+        and timestamp units) into this one in place, in linear time of the overlapping part. Rows with equal timestamps
+        are resolved according to the given policy: 'replace' - other row wins (e.g. the updated open bar), 'keep' -
+        this dataset row wins, 'error' - raise TimeframeDatasetError if rows differ. Return report dictionary with
+        numbers of inserted and updated rows. Merged data is valid, so it is not revalidated"""
+        if policy not in self.merge_policies():
+            raise TimeframeDatasetError("Merge policy must be one of {}!".format(self.merge_policies()))
+        if isinstance(other, (list, tuple)):
+            other = TimeframeDataset(list(other), self.columns, self.tsname, self.timeframe.timeframe, self.tsunit)
+        if other.columns != self.columns or other.tsname != self.tsname or other.tsunit != self.tsunit or \
+                other.timeframe.timeframe != self.timeframe.timeframe:
+            raise TimeframeDatasetError("Merged datasets must have the same columns, tsname, timeframe and tsunit!")
+        rows = other.data if isinstance(other, TimeframeDataset) else other.tolist()
+        report = {'inserted': 0, 'updated': 0}
+        if not rows:
+            return report
+        tsindex = self.tsindex
+        start = self._bisect(rows[0][tsindex])
+        tail, merged, i, j = self.data[start:], [], 0, 0
+        while i < len(tail) and j < len(rows):
+            if tail[i][tsindex] < rows[j][tsindex]:
+                merged.append(tail[i])
+                i += 1
+            elif tail[i][tsindex] > rows[j][tsindex]:
+                merged.append(list(rows[j]))
+                report['inserted'] += 1
+                j += 1
+            else:
+                if list(tail[i]) != list(rows[j]) and policy == 'error':
+                    raise TimeframeDatasetError("Merged datasets have different rows with timestamp {}!".format(
+                        rows[j][tsindex]))
+                if list(tail[i]) != list(rows[j]) and policy == 'replace':
+                    merged.append(list(rows[j]))
+                    report['updated'] += 1
+                else:
+                    merged.append(tail[i])
+                i, j = i + 1, j + 1
+        merged.extend(tail[i:])
+        merged.extend(list(row) for row in rows[j:])
+        report['inserted'] += len(rows) - j
+        if j < len(rows) or i == len(tail) and policy == 'replace':
+            self.partial = other.partial  # last row is taken from the other dataset
+        self.data[start:] = merged
+        return report
+
+    def resample(self, timeframe: str, how=None, partial=True):
+        """Aggregate dataset bars into the bars of the given coarser timeframe, vectorized. Same as
+        ColumnarTimeframeDataset.resample(), see there for details"""
+        from timeframeds import ColumnarTimeframeDataset  # imported here to avoid circular import
+        columnar = ColumnarTimeframeDataset.from_dataset(self).resample(timeframe, how, partial)
+        ds = columnar.to_dataset()
+        ds.partial = columnar.partial
+        return ds
+
     def is_last_closed(self):
         """Check last bar is closed (current timestamp is equal or bigger then closing timestamp)"""
         timestamp = time.time()
@@ -150,14 +303,38 @@ class TimeframeDataset(UserList):
 
     def is_continuous(self):
         """Check dataset is continuous (has now holes in data, has points for all timestamps)"""
-        ts = self.data[0][self.tsindex]
-        for item in self.data[1:]:
-            tsn = ts + self.timeframe.duration
-            if item[self.tsindex] == tsn:
-                ts = tsn
-            else:
-                return False
-        return True
+        return self.validate(continuous=True)['ok']
+
+    @staticmethod
+    def find_gaps(ts: np.ndarray, timeframe: Timeframe, start=None, end=None) -> list:
+        """Return list of (start, end) tuples of the missing bars ranges (start <= bar start < end, in seconds) for the
+        given sorted array of bars start timestamps ts (in seconds), vectorized. Ranges are as long as possible. If
+        start and end (in seconds) are given, only bars started in start <= timestamp < end are expected, including
+        missing bars before the first and after the last given bar"""
+        ts = np.asarray(ts, dtype=np.int64)
+        first = timeframe.span(start)[0] if start is not None else None
+        if first is not None and first < start:
+            first = int(timeframe.shift(first))
+        last = timeframe.span(end - 1)[1] if end is not None else None
+        if not len(ts):
+            return [(first, last)] if first is not None and last is not None and first < last else []
+        ends = timeframe.ends(ts)
+        holes = np.flatnonzero(ts[1:] > ends[:-1])
+        gaps = list(zip(ends[holes].tolist(), ts[holes + 1].tolist()))
+        if first is not None:
+            gaps = [(max(s, first), e) for s, e in gaps if e > first]
+            if first < ts[0]:
+                gaps.insert(0, (first, min(int(ts[0]), last) if last is not None else int(ts[0])))
+        if last is not None:
+            gaps = [(s, min(e, last)) for s, e in gaps if s < last]
+            if last > ends[-1]:
+                gaps.append((max(int(ends[-1]), first) if first is not None else int(ends[-1]), last))
+        return [(s, e) for s, e in gaps if s < e]
+
+    def gaps(self, start=None, end=None) -> list:
+        """Return list of (start, end) tuples of the missing bars ranges (in seconds), see find_gaps()"""
+        ts = np.fromiter(map(itemgetter(self.tsindex), self.data), dtype=np.int64, count=len(self.data))
+        return TimeframeDataset.find_gaps(ts // round(1 / self.tscoef), self.timeframe, start, end)
 
     def summary(self):
         """Return string with readable summary of TimeframeDataset. Usage: print(ds.summary())"""
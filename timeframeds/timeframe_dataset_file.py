@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""This module contain class TimeframeDatasetFile representing history data stored in the binary file"""
+import json
+import os
+import numpy as np
+from timeframeds import TimeframeDataset, TimeframeDatasetError, ColumnarTimeframeDataset
+
+
+class TimeframeDatasetFile:
+    """Append-only binary file with history data. File starts with the fixed size header: magic bytes and JSON with
+    columns, tsname, timeframe and tsunit padded with spaces to HEADER_SIZE bytes, followed by the fixed-width records
+    (little-endian int64 timestamp and float64 other columns, in columns order). Dataset is opened memory-mapped in
+    O(1), and append() only extends the file. Usage:
+        TimeframeDatasetFile.write('btcusd-1m.tfds', ds)
+        tfdf = TimeframeDatasetFile('btcusd-1m.tfds')
+        tfdf.append(rows)
+        ds = tfdf.dataset()  # read-only ColumnarTimeframeDataset over the memory-mapped file
+    """
+
+    MAGIC = b'TFDS'
+    """Magic bytes the file starts with"""
+
+    VERSION = 1
+    """File format version"""
+
+    HEADER_SIZE = 4096
+    """Header size in bytes, records start right after the header"""
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def columns(self) -> list:
+        return self.__header['columns']
+
+    @property
+    def tsname(self) -> str:
+        return self.__header['tsname']
+
+    @property
+    def timeframe(self) -> str:
+        return self.__header['timeframe']
+
+    @property
+    def tsunit(self) -> str:
+        return self.__header['tsunit']
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Records data type (NumPy structured data type)"""
+        return self.__dtype
+
+    def __init__(self, path: str):
+        """Open existing file with given path"""
+        self.__path = path
+        with open(path, 'rb') as f:
+            header = f.read(self.HEADER_SIZE)
+        if len(header) != self.HEADER_SIZE or not header.startswith(self.MAGIC):
+            raise TimeframeDatasetError("File {} is not a TimeframeDataset file!".format(path))
+        self.__header = json.loads(header[len(self.MAGIC):].decode('utf-8'))
+        if self.__header.get('version') != self.VERSION:
+            raise TimeframeDatasetError("File {} format version {} is not supported!".format(
+                path, self.__header.get('version')))
+        self.__dtype = self.records_dtype(self.columns, self.tsname)
+        self.__records = None
+
+    @staticmethod
+    def records_dtype(columns: list, tsname: str) -> np.dtype:
+        """Return records data type for given columns"""
+        return np.dtype([(column, '<i8' if column == tsname else '<f8') for column in columns])
+
+    @classmethod
+    def create(cls, path: str, columns: list, tsname: str, timeframe: str, tsunit='s'):
+        """Create new empty file (overwriting existing one) with given path and dataset settings and open it"""
+        TimeframeDataset.timestamp_coefficient(tsunit)
+        if tsname not in columns:
+            raise TimeframeDatasetError("Columns must contain {} column!".format(tsname))
+        header = cls.MAGIC + json.dumps({'version': cls.VERSION, 'columns': columns, 'tsname': tsname,
+                                         'timeframe': timeframe, 'tsunit': tsunit}).encode('utf-8')
+        if len(header) > cls.HEADER_SIZE:
+            raise TimeframeDatasetError("Dataset header does not fit into {} bytes!".format(cls.HEADER_SIZE))
+        with open(path, 'wb') as f:
+            f.write(header.ljust(cls.HEADER_SIZE, b' '))
+        return cls(path)
+
+    @classmethod
+    def write(cls, path: str, tfds):
+        """Write given TimeframeDataset or ColumnarTimeframeDataset tfds into the new file with given path and open
+        it"""
+        tfdf = cls.create(path, tfds.columns, tfds.tsname, tfds.timeframe.timeframe, tfds.tsunit)
+        tfdf.append(tfds)
+        return tfdf
+
+    def __len__(self):
+        """Number of records in the file (incomplete trailing record, if any, is ignored)"""
+        return (os.path.getsize(self.path) - self.HEADER_SIZE) // self.dtype.itemsize
+
+    def records(self) -> np.ndarray:
+        """Return read-only memory-mapped array of the file records. Array is mapped again only if file has grown"""
+        length = len(self)
+        if self.__records is None or len(self.__records) != length:
+            if length:
+                self.__records = np.memmap(self.path, dtype=self.dtype, mode='r', offset=self.HEADER_SIZE,
+                                           shape=(length,))
+            else:
+                self.__records = np.empty(0, dtype=self.dtype)
+        return self.__records
+
+    def dataset(self) -> ColumnarTimeframeDataset:
+        """Return ColumnarTimeframeDataset over the memory-mapped file records, without copying and validation.
+        Dataset is read-only, use copy() to get the changeable one"""
+        records = self.records()
+        # File byte order is little-endian, so columns are converted (copied) only on the big-endian machines
+        arrays = {column: records[column].astype(ColumnarTimeframeDataset.tsdtype if column == self.tsname
+                                                 else ColumnarTimeframeDataset.dtype, copy=False)
+                  for column in self.columns}
+        return ColumnarTimeframeDataset.from_arrays(arrays, self.columns, self.tsname, self.timeframe, self.tsunit)
+
+    def append(self, data):
+        """Append given data (TimeframeDataset, ColumnarTimeframeDataset, list of lists or tuples, or dictionary of
+        column values) to the end of the file. Data timestamps must be sorted and bigger then the last one"""
+        if isinstance(data, TimeframeDataset):
+            data = data.data
+        elif isinstance(data, ColumnarTimeframeDataset):
+            data = {column: data.column(column) for column in data.columns}
+        arrays = ColumnarTimeframeDataset.to_arrays(data, self.columns, self.tsname)
+        if not len(arrays[self.tsname]):
+            return
+        records = self.records()
+        report = TimeframeDataset.validate_timestamps(arrays[self.tsname])
+        if not report['ok'] or len(records) and arrays[self.tsname][0] <= records[self.tsname][-1]:
+            raise TimeframeDatasetError("Given data timestamps must be positive, sorted and bigger then the last one!")
+        new = np.empty(len(arrays[self.tsname]), dtype=self.dtype)
+        for column in self.columns:
+            new[column] = arrays[column]
+        with open(self.path, 'r+b') as f:
+            # Seek to the last complete record, so the incomplete one (interrupted append) is overwritten
+            f.seek(self.HEADER_SIZE + len(records) * self.dtype.itemsize)
+            f.write(new.tobytes())
+            f.truncate()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""This module contain class TimeframePanel representing history data of many symbols aligned on the same timestamps"""
+import numpy as np
+from timeframeds import Timeframe, TimeframeDataset, TimeframeDatasetError, ColumnarTimeframeDataset
+
+
+class TimeframePanel:
+    """Time x symbol x field panel built from the datasets of the same timeframe and timestamp units. Datasets are
+    aligned on the shared timestamps axis: union of all datasets timestamps (join='outer') or only timestamps present
+    in all datasets (join='inner'). Missing bars are NaN, or filled with the last known bar values (fill='ffill').
+    values is the float64 array of shape (len(timestamps), len(symbols), len(fields)), so cross-sectional
+    calculations are vectorized over its axes. Usage:
+        panel = TimeframePanel({'BTCUSD': ds1, 'ETHUSD': ds2}, fields=['Close', 'Volume'], fill='ffill')
+        closes = panel.field('Close')  # array of shape (len(timestamps), len(symbols))
+        panel.rank('Close')[-1]  # ranks of the symbols by the last close
+    """
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Shared timestamps axis, in tsunit"""
+        return self.__timestamps
+
+    @property
+    def symbols(self) -> list:
+        return self.__symbols
+
+    @property
+    def fields(self) -> list:
+        return self.__fields
+
+    @property
+    def values(self) -> np.ndarray:
+        """Panel values array of shape (len(timestamps), len(symbols), len(fields))"""
+        return self.__values
+
+    @property
+    def present(self) -> np.ndarray:
+        """Boolean array of shape (len(timestamps), len(symbols)), True where the symbol dataset has the bar (not
+        filled)"""
+        return self.__present
+
+    @property
+    def timeframe(self) -> Timeframe:
+        return self.__timeframe
+
+    @property
+    def tsname(self) -> str:
+        return self.__tsname
+
+    @property
+    def tsunit(self) -> str:
+        return self.__tsunit
+
+    @staticmethod
+    def joins() -> tuple:
+        """Return the tuple containing allowed timestamps axis joins"""
+        return 'outer', 'inner'
+
+    @staticmethod
+    def fills() -> tuple:
+        """Return the tuple containing allowed missing bars fills"""
+        return None, 'ffill'
+
+    def __init__(self, datasets: dict, fields=None, join='outer', fill=None):
+        """datasets: dictionary {symbol: TimeframeDataset or ColumnarTimeframeDataset}; fields: list of columns to take
+        (case insensitive, all not timestamp columns of the first dataset by default)"""
+        if not datasets:
+            raise TimeframeDatasetError("Panel needs at least one dataset!")
+        if join not in self.joins() or fill not in self.fills():
+            raise TimeframeDatasetError("Panel join must be one of {} and fill one of {}!".format(self.joins(),
+                                                                                                   self.fills()))
+        datasets = {symbol: ColumnarTimeframeDataset.from_dataset(ds) if isinstance(ds, TimeframeDataset) else ds
+                    for symbol, ds in datasets.items()}
+        first = next(iter(datasets.values()))
+        if any(ds.timeframe.timeframe != first.timeframe.timeframe or ds.tsunit != first.tsunit
+               for ds in datasets.values()):
+            raise TimeframeDatasetError("Panel datasets must have the same timeframe and tsunit!")
+        self.__timeframe, self.__tsname, self.__tsunit = first.timeframe, first.tsname, first.tsunit
+        self.__symbols = list(datasets)
+        self.__fields = list(fields or [column for column in first.columns if column != first.tsname])
+
+        timestamps = [ds.column(ds.tsname) for ds in datasets.values()]
+        if join == 'outer':
+            # Stable sort merges the already sorted runs fast
+            self.__timestamps = np.sort(np.concatenate(timestamps), kind='stable')
+            self.__timestamps = self.__timestamps[np.r_[True, self.__timestamps[1:] != self.__timestamps[:-1]]]
+        else:
+            self.__timestamps = timestamps[0]
+            for ts in timestamps[1:]:
+                self.__timestamps = np.intersect1d(self.__timestamps, ts, assume_unique=True)
+        # Symbols values are scattered into the contiguous rows first, it is faster then writing to the panel directly
+        values = np.full((len(self.__symbols), len(self.__fields), len(self.__timestamps)), np.nan)
+        present = np.zeros((len(self.__symbols), len(self.__timestamps)), dtype=bool)
+        for idx, (symbol, ds) in enumerate(datasets.items()):
+            columns = {column.lower(): column for column in ds.columns}
+            missing = [field for field in self.__fields if field.lower() not in columns]
+            if missing:
+                raise TimeframeDatasetError("Dataset {} has no {} columns!".format(symbol, missing))
+            positions = np.searchsorted(self.__timestamps, timestamps[idx])
+            found = positions < len(self.__timestamps)
+            found[found] = self.__timestamps[positions[found]] == timestamps[idx][found]
+            if not found.all():
+                positions = positions[found]
+            present[idx, positions] = True
+            for fidx, field in enumerate(self.__fields):
+                column = ds.column(columns[field.lower()])
+                values[idx, fidx, positions] = column if len(positions) == len(column) else column[found]
+        self.__values = np.ascontiguousarray(values.transpose(2, 0, 1))
+        self.__present = np.ascontiguousarray(present.T)
+        if fill == 'ffill':
+            self._ffill()
+
+    def _ffill(self):
+        """Fill missing bars with the last present bar values, vectorized. Leading missing bars stay NaN"""
+        indexes = np.where(self.__present, np.arange(len(self.__timestamps))[:, None], -1)
+        np.maximum.accumulate(indexes, axis=0, out=indexes)
+        filled = self.__values[np.maximum(indexes, 0), np.arange(len(self.__symbols))]
+        filled[indexes < 0] = np.nan
+        self.__values = filled
+
+    def __len__(self):
+        return len(self.__timestamps)
+
+    def __getitem__(self, i):
+        """Return panel view with the given timestamps slice"""
+        if not isinstance(i, slice):
+            raise TimeframeDatasetError("Panel can be sliced only by timestamps slice!")
+        panel = TimeframePanel.__new__(TimeframePanel)
+        panel.__timeframe, panel.__tsname, panel.__tsunit = self.__timeframe, self.__tsname, self.__tsunit
+        panel.__symbols, panel.__fields = self.__symbols, self.__fields
+        panel.__timestamps, panel.__values, panel.__present = self.__timestamps[i], self.__values[i], self.__present[i]
+        return panel
+
+    def between(self, start, end):
+        """Return panel view with bars started at start <= timestamp < end (in seconds)"""
+        factor = round(1 / TimeframeDataset.timestamp_coefficient(self.tsunit))
+        return self[np.searchsorted(self.__timestamps, start * factor):np.searchsorted(self.__timestamps, end * factor)]
+
+    def field(self, name: str) -> np.ndarray:
+        """Return array (view) of shape (len(timestamps), len(symbols)) with the given field values"""
+        names = [field.lower() for field in self.__fields]
+        if name.lower() not in names:
+            raise TimeframeDatasetError("Panel has no {} field!".format(name))
+        return self.__values[:, :, names.index(name.lower())]
+
+    def symbol(self, name: str) -> ColumnarTimeframeDataset:
+        """Return ColumnarTimeframeDataset with the panel values of the given symbol"""
+        if name not in self.__symbols:
+            raise TimeframeDatasetError("Panel has no {} symbol!".format(name))
+        arrays = {field: self.__values[:, self.__symbols.index(name), idx] for idx, field in enumerate(self.__fields)}
+        arrays[self.tsname] = self.__timestamps
+        return ColumnarTimeframeDataset(arrays, [self.tsname] + self.__fields, self.tsname, self.timeframe.timeframe,
+                                        self.tsunit)
+
+    def returns(self, field='close') -> np.ndarray:
+        """Return array of shape (len(timestamps), len(symbols)) with the relative changes of the given field values
+        from the previous bar (NaN for the first bar)"""
+        values = self.field(field)
+        res = np.full(values.shape, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            res[1:] = values[1:] / values[:-1] - 1
+        return res
+
+    def rank(self, field='close') -> np.ndarray:
+        """Return array of shape (len(timestamps), len(symbols)) with the cross-sectional ranks (0 for the smallest) of
+        the given field values for every timestamp. NaN values are not ranked (rank is NaN)"""
+        values = self.field(field)
+        ranks = np.argsort(np.argsort(np.where(np.isnan(values), np.inf, values), axis=1, kind='stable'), axis=1)
+        return np.where(np.isnan(values), np.nan, ranks)
+
+    def zscore(self, field='close') -> np.ndarray:
+        """Return array of shape (len(timestamps), len(symbols)) with the cross-sectional z-scores of the given field
+        values for every timestamp, NaN values are ignored"""
+        values = self.field(field)
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(valid, values, 0.0).sum(axis=1, keepdims=True) / count
+            std = np.sqrt(np.where(valid, (values - mean) ** 2, 0.0).sum(axis=1, keepdims=True) / count)
+            return (values - mean) / std
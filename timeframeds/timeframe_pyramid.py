@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""This module contain class TimeframePyramid representing incrementally updated multi-timeframe candles"""
+import numpy as np
+from timeframeds import Timeframe, TimeframeDataset, TimeframeDatasetError, ColumnarTimeframeDataset
+
+
+class TimeframePyramid:
+    """Multi-timeframe candle pyramid. Keep the base timeframe dataset and datasets of the coarser timeframes derived
+    from it (see ColumnarTimeframeDataset.resample()), and update all of them in amortized O(1) per base bar, including
+    the still open last bars. Usage:
+        pyramid = TimeframePyramid(ds, ['5m', '1h', '1D'])
+        pyramid.append(row)  # next base bar, or updated version of the last (open) base bar
+        pyramid['1h'].get_dict(-1)
+    """
+
+    @property
+    def base(self) -> ColumnarTimeframeDataset:
+        return self.__base
+
+    @property
+    def timeframes(self) -> list:
+        return list(self.__datasets)
+
+    def __init__(self, base, timeframes: list, how=None):
+        """base: TimeframeDataset or ColumnarTimeframeDataset with the base timeframe bars (may be empty);
+        timeframes: list of coarser timeframe codes; how: aggregations overrides, see resample()"""
+        if isinstance(base, TimeframeDataset):
+            base = ColumnarTimeframeDataset.from_dataset(base)
+        self.__base = base
+        aggregations = base.aggregations(how)
+        self.__aggregations = [aggregations[column] for column in base.columns]
+        self.__factor = round(1 / base.tscoef)
+        self.__datasets = {}
+        self.__committed = {}
+        for timeframe in sorted(timeframes, key=lambda tf: Timeframe(tf).duration):
+            ds = base.resample(timeframe, how)
+            self.__datasets[timeframe] = ds
+            # Aggregate of the closed base bars of the last bucket, the last (open) base bar is added on the fly
+            first = np.searchsorted(base.column(base.tsname), ds.column(ds.tsname)[-1]) if len(ds) else len(base)
+            closed = base[first:-1]
+            self.__committed[timeframe] = closed.resample(timeframe, how)[-1] if len(closed) else None
+
+    def __getitem__(self, timeframe: str) -> ColumnarTimeframeDataset:
+        if timeframe == self.base.timeframe.timeframe:
+            return self.base
+        if timeframe not in self.__datasets:
+            raise TimeframeDatasetError("Pyramid has no {} timeframe!".format(timeframe))
+        return self.__datasets[timeframe]
+
+    def _bounds(self, timeframe: Timeframe, timestamp) -> tuple:
+        """Return (start, end) of the given timeframe bar containing given timestamp (all in base timestamp units)"""
+        start, end = timeframe.span(timestamp // self.__factor)
+        return start * self.__factor, end * self.__factor
+
+    def _combine(self, aggregate, row) -> list:
+        """Return aggregate of the given aggregated row and the next row"""
+        if aggregate is None:
+            return list(row)
+        functions = {'first': lambda a, r: a, 'last': lambda a, r: r, 'max': max, 'min': min,
+                     'sum': lambda a, r: a + r}
+        return [functions[aggregation](a, r) for aggregation, a, r in zip(self.__aggregations, aggregate, row)]
+
+    def append(self, row):
+        """Feed the next base bar, or updated version of the last base bar (with the same timestamp), and update all
+        derived timeframes"""
+        tsindex = self.base.tsindex
+        previous = self.base[-1] if len(self.base) else None
+        if previous is not None and row[tsindex] == previous[tsindex]:
+            self.base.amend(row)
+            previous = None
+        else:
+            self.base.append(row)
+        _, base_end = self._bounds(self.base.timeframe, row[tsindex])
+        for timeframe, ds in self.__datasets.items():
+            start, end = self._bounds(ds.timeframe, row[tsindex])
+            if previous is not None:
+                # Previous base bar is closed now, and it belongs to the last bucket
+                self.__committed[timeframe] = self._combine(self.__committed[timeframe], previous)
+            same_bucket = len(ds) and start == ds.column(ds.tsname)[-1]
+            bar = self._combine(self.__committed[timeframe] if same_bucket else None, row)
+            bar[tsindex] = start
+            if same_bucket:
+                ds.amend(bar)
+            else:
+                self.__committed[timeframe] = None
+                ds.append(bar)
+            ds.partial = base_end < end
+
+    def extend(self, rows):
+        """Feed given base bars one by one, see append()"""
+        for row in rows:
+            self.append(row)
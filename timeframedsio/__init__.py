@@ -0,0 +1 @@
+from .timeframedsio import *
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Bulk TimeframeDataset reading and writing in CSV, Parquet and Arrow IPC formats with pyarrow. Files are streamed
+batch by batch, and datasets are built from the whole columns, without creating Python objects for every row"""
+import json
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from timeframeds import TimeframeDataset, TimeframeDatasetError, ColumnarTimeframeDataset
+
+METADATA_KEY = b'timeframeds'
+"""Parquet and Arrow schema metadata key with the dataset tsname, timeframe and tsunit JSON"""
+
+
+def _metadata(schema) -> dict:
+    """Return dataset settings stored in the given Arrow schema metadata, or empty dictionary"""
+    metadata = schema.metadata or {}
+    return json.loads(metadata[METADATA_KEY].decode('utf-8')) if METADATA_KEY in metadata else {}
+
+
+def _array(array, dtype, tsunit=None) -> np.ndarray:
+    """Convert given Arrow array to NumPy array of given dtype (zero copy where possible). Arrow timestamps are
+    converted to the integer timestamps in the given tsunit"""
+    if pa.types.is_timestamp(array.type):
+        values = array.to_numpy(zero_copy_only=False)
+        return values.astype('datetime64[{}]'.format(tsunit)).view(np.int64)
+    return np.asarray(array.to_numpy(zero_copy_only=False), dtype=dtype)
+
+
+def _load(schema, batches, timeframe=None, columns=None, tsname=None, tsunit=None, names=None, columnar=True):
+    """Build dataset from the given Arrow schema and record batches iterable. See read_csv() for arguments"""
+    settings = _metadata(schema)
+    columns = columns or schema.names
+    tsname = tsname or settings.get('tsname') or columns[0]
+    timeframe = timeframe or settings.get('timeframe')
+    tsunit = tsunit or settings.get('tsunit') or 's'
+    if timeframe is None:
+        raise TimeframeDatasetError("Timeframe must be given, file has no timeframe metadata!")
+    names = names or {}
+    missing = [column for column in columns if column not in schema.names]
+    if missing or tsname not in columns:
+        raise TimeframeDatasetError("File has no {} columns!".format(missing or [tsname]))
+    dataset_columns = [names.get(column, column) for column in columns]
+    dataset_tsname = names.get(tsname, tsname)
+    ds = ColumnarTimeframeDataset({column: [] for column in dataset_columns}, columns=dataset_columns,
+                                  tsname=dataset_tsname, timeframe=timeframe, tsunit=tsunit)
+    for batch in batches:
+        ds.extend({names.get(column, column): _array(batch.column(batch.schema.get_field_index(column)),
+                                                     ds.tsdtype if column == tsname else ds.dtype, tsunit)
+                   for column in columns})
+    return ds if columnar else ds.to_dataset()
+
+
+def _batches(tfds, batch_size: int):
+    """Yield Arrow record batches with given dataset tfds rows, batch_size rows per batch"""
+    if isinstance(tfds, TimeframeDataset):
+        tfds = ColumnarTimeframeDataset.from_dataset(tfds)
+    schema = _schema(tfds)
+    for start in range(0, len(tfds), batch_size):
+        yield pa.record_batch([pa.array(tfds.column(column)[start:start + batch_size]) for column in tfds.columns],
+                              schema=schema)
+
+
+def _schema(tfds) -> pa.Schema:
+    """Return Arrow schema for the given dataset tfds, with the dataset settings in metadata"""
+    settings = {'tsname': tfds.tsname, 'timeframe': tfds.timeframe.timeframe, 'tsunit': tfds.tsunit}
+    fields = [pa.field(column, pa.int64() if column == tfds.tsname else pa.float64()) for column in tfds.columns]
+    return pa.schema(fields, metadata={METADATA_KEY: json.dumps(settings).encode('utf-8')})
+
+
+def read_csv(path: str, timeframe: str, columns=None, tsname=None, tsunit=None, names=None, columnar=True,
+             delimiter=',', block_size=1 << 24):
+    """Read dataset from CSV file with header, streaming it by blocks of block_size bytes.
+    columns: list of file columns to read (all columns by default); tsname: file timestamp column (the first one by
+    default), integer timestamps or ISO datetimes (parsed as UTC); tsunit: timestamp units ('s' by default);
+    names: dictionary {file column name: dataset column name} to rename columns; columnar: return
+    ColumnarTimeframeDataset if True, TimeframeDataset otherwise"""
+    convert_options = pacsv.ConvertOptions(
+        include_columns=columns or [],
+        column_types={column: pa.float64() for column in columns or [] if column != (tsname or columns[0])})
+    reader = pacsv.open_csv(path, read_options=pacsv.ReadOptions(block_size=block_size),
+                            parse_options=pacsv.ParseOptions(delimiter=delimiter), convert_options=convert_options)
+    return _load(reader.schema, reader, timeframe, columns, tsname, tsunit, names, columnar)
+
+
+def read_parquet(path: str, timeframe=None, columns=None, tsname=None, tsunit=None, names=None, columnar=True,
+                 batch_size=1 << 20):
+    """Read dataset from Parquet file, streaming it by batches of batch_size rows. Timeframe, tsname and tsunit are
+    taken from the file metadata (if file was written by write_parquet()) unless given. See read_csv() for arguments"""
+    pf = pq.ParquetFile(path)
+    return _load(pf.schema_arrow, pf.iter_batches(batch_size=batch_size, columns=columns), timeframe, columns, tsname,
+                 tsunit, names, columnar)
+
+
+def read_arrow(path: str, timeframe=None, columns=None, tsname=None, tsunit=None, names=None, columnar=True):
+    """Read dataset from Arrow IPC file (memory-mapped), batch by batch. Timeframe, tsname and tsunit are taken from the
+    file metadata (if file was written by write_arrow()) unless given. See read_csv() for arguments"""
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        return _load(reader.schema, batches, timeframe, columns, tsname, tsunit, names, columnar)
+
+
+def write_csv(tfds, path: str, batch_size=1 << 20):
+    """Write given TimeframeDataset or ColumnarTimeframeDataset tfds to CSV file with header, batch by batch.
+    Timestamps are written as integers"""
+    with pacsv.CSVWriter(path, _schema(tfds)) as writer:
+        for batch in _batches(tfds, batch_size):
+            writer.write_batch(batch)
+
+
+def write_parquet(tfds, path: str, batch_size=1 << 20, compression='snappy'):
+    """Write given TimeframeDataset or ColumnarTimeframeDataset tfds to Parquet file, batch_size rows per row group.
+    Dataset tsname, timeframe and tsunit are stored in the file metadata"""
+    with pq.ParquetWriter(path, _schema(tfds), compression=compression) as writer:
+        for batch in _batches(tfds, batch_size):
+            writer.write_batch(batch)
+
+
+def write_arrow(tfds, path: str, batch_size=1 << 20):
+    """Write given TimeframeDataset or ColumnarTimeframeDataset tfds to Arrow IPC file, batch by batch. Dataset tsname,
+    timeframe and tsunit are stored in the file metadata"""
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, _schema(tfds)) as writer:
+        for batch in _batches(tfds, batch_size):
+            writer.write_batch(batch)
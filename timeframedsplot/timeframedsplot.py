@@ -5,27 +5,101 @@ import calendar
 from pprint import pprint
 import ciso8601
 import mplfinance as mpf
+import numpy as np
 import pandas as pd
-from timeframeds import TimeframeDataset
-
-
-def tfds2pdf(tfds: TimeframeDataset):
-    """Convert given TimeframeDataset tfds to Pandas Dataframe"""
-    d = {}
-    for i, _ in enumerate(tfds):
-        drow = tfds.get_dict(i, timestamp_format='human')
-        dt = drow[tfds.tsname]
-        del drow[tfds.tsname]
-        d[dt] = drow
-    pdf = pd.DataFrame.from_dict(d, orient='index')
-    pdf.index.name = tfds.tsname
-    pdf.index = pd.to_datetime(pdf.index)
-    return pdf
-
-
-def plot(tfds: TimeframeDataset):
-    """Plot given TimeframeDataset tfds"""
-    mpf.plot(tfds2pdf(tfds), type='candle', show_nontrading=True)
+import matplotlib as mpl
+from timeframeds import Timeframe, TimeframeDataset, ColumnarTimeframeDataset
+
+PIXELS_PER_BAR = 3
+
+
+def tfds2pdf(tfds):
+    """Convert given TimeframeDataset or ColumnarTimeframeDataset tfds to Pandas Dataframe indexed by naive UTC
+    DatetimeIndex, vectorized. Columns of ColumnarTimeframeDataset are not copied where pandas allows it, so do not
+    modify the resulting dataframe in place if the dataset must stay intact"""
+    if isinstance(tfds, TimeframeDataset):
+        arrays = ColumnarTimeframeDataset.to_arrays(tfds.data, tfds.columns, tfds.tsname)
+    else:
+        arrays = {column: tfds.column(column) for column in tfds.columns}
+    index = pd.DatetimeIndex(arrays[tfds.tsname].view('datetime64[{}]'.format(tfds.tsunit)), name=tfds.tsname)
+    return pd.DataFrame({column: arrays[column] for column in tfds.columns if column != tfds.tsname}, index=index,
+                        copy=False)
+
+
+def pdf2tfds(pdf: pd.DataFrame, timeframe: str, tsname=None, tsunit='s', columnar=False):
+    """Convert given Pandas Dataframe pdf indexed by DatetimeIndex (naive UTC) to TimeframeDataset (or
+    ColumnarTimeframeDataset if columnar is True), vectorized. This function is reverse to tfds2pdf()"""
+    tsname = tsname or pdf.index.name or 'Timestamp'
+    arrays = {column: pdf[column].to_numpy(dtype=np.float64) for column in pdf.columns}
+    arrays[tsname] = pdf.index.to_numpy(dtype='datetime64[{}]'.format(tsunit)).view(np.int64)
+    tfds = ColumnarTimeframeDataset(arrays, columns=[tsname] + list(pdf.columns), tsname=tsname,
+                                    timeframe=timeframe, tsunit=tsunit)
+    return tfds if columnar else tfds.to_dataset()
+
+
+def lttb(x, y, threshold: int) -> np.ndarray:
+    """Return indexes of the threshold points of the (x, y) line chosen with Largest-Triangle-Three-Buckets algorithm,
+    so the downsampled line keeps the visual shape of the original one. First and last points are always kept"""
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    if threshold >= len(x) or threshold < 3:
+        return np.arange(len(x))
+    every = (len(x) - 2) / (threshold - 2)
+    edges = (np.arange(threshold) * every).astype(np.int64) + 1
+    edges[-1] = len(x)
+    indexes = np.empty(threshold, dtype=np.int64)
+    indexes[0], indexes[-1] = 0, len(x) - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end, following = edges[i], edges[i + 1], edges[min(i + 2, threshold - 1)]
+        avgx, avgy = x[end:following].mean() if following > end else x[-1], \
+            y[end:following].mean() if following > end else y[-1]
+        area = np.abs((x[a] - avgx) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avgy - y[a]))
+        a = start + int(np.argmax(area))
+        indexes[i + 1] = a
+    return indexes
+
+
+def decimate(tfds, bars: int):
+    """Return ColumnarTimeframeDataset with no more then given bars number of bars made from the given dataset tfds:
+    bars are aggregated into the smallest coarser timeframe that fits (OHLC preserving, see
+    ColumnarTimeframeDataset.resample()), if even monthly bars do not fit, they are downsampled with lttb()"""
+    if isinstance(tfds, TimeframeDataset):
+        tfds = ColumnarTimeframeDataset.from_dataset(tfds)
+    if len(tfds) <= bars:
+        return tfds
+    ts = tfds.column(tfds.tsname)
+    span = (ts[-1] - ts[0]) * tfds.tscoef + tfds.timeframe.duration
+    for timeframe in Timeframe.timeframes():
+        duration = Timeframe(timeframe).duration
+        if duration > tfds.timeframe.duration and (span / duration <= bars - 1 or timeframe == '1M'):
+            tfds = tfds.resample(timeframe)
+            break
+    if len(tfds) > bars:
+        columns = [column for column in tfds.columns if column.lower() == 'close'] or [tfds.columns[-1]]
+        indexes = lttb(tfds.column(tfds.tsname), tfds.column(columns[0]), bars)
+        tfds = ColumnarTimeframeDataset({column: tfds.column(column)[indexes] for column in tfds.columns},
+                                        columns=tfds.columns, tsname=tfds.tsname, timeframe=tfds.timeframe.timeframe,
+                                        tsunit=tfds.tsunit)
+    return tfds
+
+
+def plot(tfds, type='candle', bars=None, **kwargs):
+    """Plot given TimeframeDataset or ColumnarTimeframeDataset tfds with mplfinance. Dataset is decimated to the given
+    bars number of bars first (see decimate()), by default it is calculated from the figure width (figsize keyword
+    argument or matplotlib default), so plotting time is bounded for any dataset size. Line charts are downsampled with
+    lttb(). Other keyword arguments are passed to mplfinance.plot(), its result is returned (e.g. figure and axes if
+    returnfig is True)"""
+    if bars is None:
+        figsize = kwargs.get('figsize', mpl.rcParams['figure.figsize'])
+        bars = max(3, int(figsize[0] * mpl.rcParams['figure.dpi'] / PIXELS_PER_BAR))
+    if type == 'line':
+        pdf = tfds2pdf(tfds)
+        close = [column for column in pdf.columns if column.lower() == 'close'] or [pdf.columns[-1]]
+        pdf = pdf.iloc[lttb(pdf.index.asi8, pdf[close[0]].to_numpy(), bars)]
+    else:
+        pdf = tfds2pdf(decimate(tfds, bars))
+    kwargs.setdefault('show_nontrading', True)
+    return mpf.plot(pdf, type=type, **kwargs)
 
 
 if __name__ == '__main__':